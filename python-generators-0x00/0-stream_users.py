@@ -1,44 +1,35 @@
 from typing import Generator, Dict, Any
-from seed import DatabaseManager  # Import the DatabaseManager from seed.py
-import mysql.connector
-from mysql.connector import Error
+from seed import get_pool, stream_formatted, STREAM_FETCH_SIZE, Error  # Shared pool and streaming helper from seed.py
 
-def stream_users() -> Generator[Dict[str, Any], None, None]:
+def stream_users(fetch_size: int = STREAM_FETCH_SIZE, row_format: str = 'dict') -> Generator[Dict[str, Any], None, None]:
     """
     Generator function that streams rows from user_data table one by one
     using yield. Only contains one loop.
-    Uses DatabaseManager from seed.py to handle database connections.
+    Uses the shared connection pool from seed.py to handle database connections.
+    
+    Rows are read through an unbuffered (server-side) cursor, fetch_size at a
+    time, so peak memory is bounded by one fetch (about fetch_size * 1 KB,
+    see seed.STREAM_ROW_BYTES) no matter how large the table is.
+    
+    Args:
+        fetch_size: Number of rows pulled from the server per round trip
+        row_format: 'dict' (default), 'tuple' or 'record' (seed.UserRecord)
     
     Yields:
-        Dictionary containing user data (user_id, name, email, age)
+        User data (user_id, name, email, age) in the requested row format
     """
-    db_manager = None
-    cursor = None
+    if row_format == 'columns':
+        raise ValueError("stream_users yields single rows; use stream_users_in_batches for 'columns'")
     
     try:
-        # Create DatabaseManager instance and connect to ALX_prodev
-        db_manager = DatabaseManager()
-        connection = db_manager.connect_to_prodev()  # Use the class method
-        
-        # Create a server-side cursor for efficient memory usage
-        cursor = connection.cursor(dictionary=True)
-        
-        # Execute query
-        cursor.execute("SELECT user_id, name, email, age FROM user_data")
-        
-        # Single loop that yields rows one by one
-        while True:
-            row = cursor.fetchone()  # Get one row at a time
-            if row is None:  # No more rows
-                break
-            yield dict(row)  # Yield the row as a dictionary
+        # Check out a pooled connection to ALX_prodev (returned on exit)
+        with get_pool().connection() as connection:
+            query = "SELECT user_id, name, email, age FROM user_data"
+            
+            # Single loop that yields rows one by one from each fetched block
+            for rows in stream_formatted(connection, query, fetch_size=fetch_size, row_format=row_format):
+                yield from rows  # Rows are already built by the cursor, no copy needed
             
     except Error as e:
         print(f"Database error: {e}")
         raise
-    finally:
-        # Clean up resources
-        if cursor:
-            cursor.close()
-        if db_manager:
-            db_manager.close_connection()  # Use the class's cleanup method
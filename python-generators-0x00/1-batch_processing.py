@@ -1,67 +1,147 @@
-from typing import Generator, List, Dict, Any
-from seed import DatabaseManager
-import mysql.connector
-from mysql.connector import Error
+from typing import Generator, List, Dict, Any, Optional, Union
+from seed import (get_pool, stream_formatted, prefetched, key_getter, AdaptiveBatchSize, QuerySpec, Error,
+                  ADAPTIVE_MIN_SIZE, ADAPTIVE_MAX_SIZE)
+from parallel_scan import parallel_scan
 
 
-def stream_users_in_batches(batch_size: int) -> Generator[List[Dict[str, Any]], None, None]:
+def stream_users_in_batches(batch_size: int, spec: Optional[QuerySpec] = None,
+                            row_format: str = 'dict', prefetch: int = 0,
+                            checkpoint: Optional[Any] = None,
+                            adaptive: Union[bool, AdaptiveBatchSize] = False) -> Generator[Any, None, None]:
     """
     Generator function that streams rows from user_data table in batches.
 
     Args:
         batch_size: Number of rows to fetch in each batch
+        spec: Optional QuerySpec; its filters, columns and ordering are compiled
+              to SQL so only matching rows and needed columns are transferred
+        row_format: 'dict' (default), 'tuple', 'record' (seed.UserRecord) or
+                    'columns' (one {column: values} dict per batch)
+        prefetch: When > 0, fetch up to this many batches ahead on a background
+                  thread so DB latency overlaps with the consumer's processing
+        checkpoint: Optional checkpoint.FileCheckpoint / SQLiteCheckpoint.
+                    Rows are streamed in user_id order, resuming after the saved
+                    key, and the key is saved once each batch is processed.
+                    user_id is added to the spec's columns when missing (so
+                    batches carry it), and a spec with its own ordering is
+                    rejected with ValueError
+        adaptive: True (or a configured seed.AdaptiveBatchSize) to start at
+                  batch_size and resize every batch toward a latency and
+                  memory target within hard limits; batch sizes then vary
 
     Yields:
-        List of dictionaries containing user data batches
+        Batches of user data in the requested row format
     """
-    db_manager = None
-    cursor = None
+    if adaptive is True:
+        # The default limits are widened to the caller's size, so the first
+        # batch has exactly batch_size rows
+        adaptive = AdaptiveBatchSize(initial=batch_size,
+                                     min_size=min(batch_size, ADAPTIVE_MIN_SIZE),
+                                     max_size=max(batch_size, ADAPTIVE_MAX_SIZE))
+    if checkpoint is not None:
+        yield from _checkpointed_batches(batch_size, spec, row_format, prefetch, checkpoint, adaptive)
+        return
+    if prefetch:
+        yield from prefetched(stream_users_in_batches(batch_size, spec, row_format, adaptive=adaptive), prefetch)
+        return
+
+    spec = spec or QuerySpec()
+    query, params = spec.to_sql()
 
     try:
-        # Create DatabaseManager instance and connect to ALX_prodev
-        db_manager = DatabaseManager()
-        connection = db_manager.connect_to_prodev()
+        # Check out a pooled connection to ALX_prodev (returned on exit)
+        with get_pool().connection() as connection:
+            # LOOP 1: Batch streaming loop over an unbuffered (server-side) cursor.
+            # Each fetched block is yielded as the batch without copying the rows.
+            fetch_size = adaptive or batch_size
+            for batch in stream_formatted(connection, query, params, spec.columns, fetch_size, row_format):
+                yield batch
 
-        # Create a server-side cursor for efficient memory usage
-        cursor = connection.cursor(dictionary=True)
+    except Error as e:
+        print(f"Database error: {e}")
+        raise
 
-        # Execute query
-        cursor.execute("SELECT user_id, name, email, age FROM user_data")
 
-        # LOOP 1: Batch streaming loop
-        while True:
-            rows = cursor.fetchmany(batch_size)  # Get batch of rows
-            if not rows:  # No more rows
-                break
+def _checkpointed_batches(batch_size: int, spec: Optional[QuerySpec], row_format: str,
+                          prefetch: int, checkpoint: Any,
+                          adaptive: Union[bool, AdaptiveBatchSize] = False) -> Generator[Any, None, None]:
+    """
+    Resumable variant of stream_users_in_batches. The scan is ordered by the
+    primary key and restarts with an index seek (user_id > last committed key),
+    so completed batches are never re-read after a restart.
+    """
+    spec = spec or QuerySpec()
+    if spec.ordering and spec.ordering != (('user_id', False),):
+        raise ValueError("A checkpointed scan is ordered by user_id; remove the spec's ordering")
+    if 'user_id' not in spec.columns:
+        spec = spec.select(*spec.columns, 'user_id')
+    spec = QuerySpec(spec.columns, spec.filters, (('user_id', False),))
 
-            # Convert each row to dictionary and yield the batch
-            batch = [dict(row) for row in rows]
-            yield batch
+    last_key = checkpoint.load()
+    if last_key is not None:
+        print(f"Resuming after user_id {last_key}")
+        spec = spec.where('user_id', '>', last_key)
 
-    except Error as e:
-        print(f"Database error: {e}")
-        raise
-    finally:
-        # Clean up resources
-        if cursor:
-            cursor.close()
-        if db_manager:
-            db_manager.close_connection()
+    if row_format == 'columns':
+        batch_last_key = lambda batch: batch['user_id'][-1]
+    else:
+        row_key = key_getter(row_format, spec.columns)
+        batch_last_key = lambda batch: row_key(batch[-1])
 
+    for batch in stream_users_in_batches(batch_size, spec, row_format, prefetch, adaptive=adaptive):
+        yield batch
+        # The consumer asked for the next batch, so this one is committed
+        checkpoint.save(str(batch_last_key(batch)))
 
-def batch_processing(batch_size: int = 100) -> Generator[Dict[str, Any], None, None]:
+
+def users_over_25(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Keeps the users older than 25 from a batch (picklable, so it can run in
+    parallel_scan worker processes)
+    """
+    return [user for user in batch if user['age'] > 25]
+
+
+def batch_processing(batch_size: int = 100, push_down: bool = True,
+                     workers: Optional[int] = None,
+                     vectorized: bool = False) -> Generator[Dict[str, Any], None, None]:
     """
     Processes batches of users to filter those over age 25.
 
     Args:
         batch_size: Number of rows to process in each batch
+        push_down: Evaluate the age filter in SQL (served by idx_age) instead
+                   of fetching every user and filtering in Python
+        workers: When set, scan user_data in this many partitions on a
+                 process pool (see parallel_scan) instead of one cursor
+        vectorized: Fetch column batches and evaluate the Python-side filter
+                    as one array comparison per batch (see vectorized.py)
 
     Yields:
         Individual user dictionaries for users over age 25
     """
+    over_25 = QuerySpec().where('age', '>', 25)
+
+    if vectorized:
+        # Imported here: vectorized.py itself builds on stream_users_in_batches
+        from vectorized import vectorized_batches
+        for rows in vectorized_batches(batch_size, over_25 if push_down else None,
+                                       filters=() if push_down else over_25.filters,
+                                       materialize_rows=True):
+            yield from rows
+        return
+
+    if workers:
+        batches = parallel_scan(
+            workers, spec=over_25 if push_down else None, batch_size=batch_size,
+            process_batch=None if push_down else users_over_25,
+        )
+    else:
+        batches = stream_users_in_batches(batch_size, over_25 if push_down else None)
+
     # LOOP 2: Iterate through batches from stream_users_in_batches
-    for batch in stream_users_in_batches(batch_size):
+    for batch in batches:
         # LOOP 3: Process each user in the current batch
         for user in batch:
-            if user['age'] > 25:
+            if push_down or workers or over_25.matches(user):
                 yield user
@@ -1,7 +1,9 @@
-import mysql.connector
-from mysql.connector import Error
-from typing import Generator, List, Dict, Any
-from seed import DatabaseManager
+import base64
+import json
+import time
+from typing import Generator, List, Dict, Any, Optional, Tuple
+from seed import get_backend, get_pool, prefetched, Error
+from instrumentation import ROWS_READ, get_instrumentation
 
 def paginate_users(page_size: int, offset: int) -> List[Dict[str, Any]]:
     """
@@ -14,51 +16,169 @@ def paginate_users(page_size: int, offset: int) -> List[Dict[str, Any]]:
     Returns:
         List of user dictionaries for the requested page
     """
-    db_manager = None
-    cursor = None
-    
     try:
-        # Create DatabaseManager instance and connect to ALX_prodev
-        db_manager = DatabaseManager()
-        connection = db_manager.connect_to_prodev()
-        
-        # Create a cursor
-        cursor = connection.cursor(dictionary=True)
-        
-        # Execute paginated query
-        query = """
-            SELECT user_id, name, email, age 
-            FROM user_data 
-            ORDER BY user_id 
-            LIMIT %s OFFSET %s
-        """
-        cursor.execute(query, (page_size, offset))
-        
-        # Fetch all results for this page
-        users = [dict(row) for row in cursor.fetchall()]
-        return users
+        # Check out a pooled connection to ALX_prodev (returned on exit)
+        with get_pool().connection() as connection:
+            # Create a cursor
+            cursor = connection.cursor(dictionary=True)
+            try:
+                # Execute paginated query
+                query = """
+                    SELECT user_id, name, email, age 
+                    FROM user_data 
+                    ORDER BY user_id 
+                    LIMIT %s OFFSET %s
+                """
+                metrics = get_instrumentation()
+                with metrics.timed('page'):
+                    cursor.execute(query, (page_size, offset))
+                    
+                    # Fetch all results for this page
+                    users = [dict(row) for row in cursor.fetchall()]
+                metrics.count(ROWS_READ, len(users))
+                return users
+            finally:
+                # Clean up resources before the connection goes back to the pool
+                cursor.close()
         
     except Error as e:
         print(f"Database error in paginate_users: {e}")
         raise
-    finally:
-        # Clean up resources
-        if cursor:
-            cursor.close()
-        if db_manager:
-            db_manager.close_connection()
 
-def lazy_paginate(page_size: int) -> Generator[List[Dict[str, Any]], None, None]:
+def encode_page_token(last_user_id: str) -> str:
+    """
+    Encodes the last seen key into an opaque continuation token.
+    
+    Args:
+        last_user_id: user_id of the last row on the current page
+    
+    Returns:
+        URL-safe token string
+    """
+    payload = json.dumps({"after": last_user_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+def decode_page_token(token: str) -> str:
+    """
+    Decodes a continuation token produced by encode_page_token.
+    
+    Args:
+        token: Token returned by lazy_paginate_keyset
+    
+    Returns:
+        The user_id to resume after
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        return payload["after"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid page token: {token!r}") from e
+
+def paginate_users_after(page_size: int, last_user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Fetches the page of users that follows last_user_id (keyset / seek pagination).
+    The primary key index is used to seek straight to the start of the page, so
+    deep pages cost the same as the first one.
+    
+    Args:
+        page_size: Number of users per page
+        last_user_id: user_id of the last row already seen (None for the first page)
+    
+    Returns:
+        List of user dictionaries for the requested page
+    """
+    try:
+        # Check out a pooled connection to ALX_prodev (returned on exit)
+        with get_pool().connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            metrics = get_instrumentation()
+            try:
+                if last_user_id is None:
+                    query = """
+                        SELECT user_id, name, email, age 
+                        FROM user_data 
+                        ORDER BY user_id 
+                        LIMIT %s
+                    """
+                    params = (page_size,)
+                else:
+                    query = """
+                        SELECT user_id, name, email, age 
+                        FROM user_data 
+                        WHERE user_id > %s 
+                        ORDER BY user_id 
+                        LIMIT %s
+                    """
+                    params = (get_backend().key_param(last_user_id), page_size)
+                
+                with metrics.timed('page'):
+                    cursor.execute(query, params)
+                    users = [dict(row) for row in cursor.fetchall()]
+                metrics.count(ROWS_READ, len(users))
+                return users
+            finally:
+                # Clean up resources before the connection goes back to the pool
+                cursor.close()
+        
+    except Error as e:
+        print(f"Database error in paginate_users_after: {e}")
+        raise
+
+def lazy_paginate_keyset(page_size: int, token: Optional[str] = None) -> Generator[Tuple[List[Dict[str, Any]], Optional[str]], None, None]:
+    """
+    Generator that lazily loads pages using keyset pagination.
+    Each page is yielded together with an opaque continuation token that can be
+    passed back later to resume right after that page.
+    
+    Args:
+        page_size: Number of users per page
+        token: Continuation token to resume from (None starts at the beginning)
+    
+    Yields:
+        Tuple of (list of user dictionaries, token for the next page).
+        The token is None on the last page.
+    """
+    last_user_id = decode_page_token(token) if token else None
+    
+    # SINGLE LOOP: Continue until a short page signals the end
+    while True:
+        current_page = paginate_users_after(page_size, last_user_id)
+        if not current_page:
+            break
+        
+        last_user_id = current_page[-1]['user_id']
+        # A short page is the last one, so no further round trip is needed
+        next_token = encode_page_token(last_user_id) if len(current_page) == page_size else None
+        yield current_page, next_token
+        
+        if next_token is None:
+            break
+
+def lazy_paginate(page_size: int, mode: str = "offset", prefetch: int = 0) -> Generator[List[Dict[str, Any]], None, None]:
     """
     Generator that lazily loads paginated user data one page at a time.
     Only fetches the next page when needed.
     
     Args:
         page_size: Number of users per page
+        mode: "offset" (LIMIT/OFFSET) or "keyset" (WHERE user_id > last_seen).
+              Use lazy_paginate_keyset directly to get continuation tokens.
+        prefetch: When > 0, fetch up to this many pages ahead on a background
+                  thread so DB latency overlaps with the consumer's processing
     
     Yields:
         List of user dictionaries for each page
     """
+    if prefetch:
+        yield from prefetched(lazy_paginate(page_size, mode), prefetch)
+        return
+    if mode == "keyset":
+        for current_page, _ in lazy_paginate_keyset(page_size):
+            yield current_page
+        return
+    if mode != "offset":
+        raise ValueError("mode must be 'offset' or 'keyset'")
+    
     offset = 0
     
     # SINGLE LOOP: Continue until no more users are returned
@@ -1,7 +1,6 @@
-import mysql.connector
-from mysql.connector import Error
 from typing import Generator
-from seed import DatabaseManager
+from seed import get_pool, stream_query, Error
+from aggregation import aggregate
 
 def stream_user_ages() -> Generator[int, None, None]:
     """
@@ -10,56 +9,39 @@ def stream_user_ages() -> Generator[int, None, None]:
     Yields:
         Integer representing user age
     """
-    db_manager = None
-    cursor = None
-    
     try:
-        # Create DatabaseManager instance and connect to ALX_prodev
-        db_manager = DatabaseManager()
-        connection = db_manager.connect_to_prodev()
-        
-        # Create a server-side cursor for efficient memory usage
-        cursor = connection.cursor()
-        
-        # Execute query to get only ages
-        cursor.execute("SELECT age FROM user_data")
-        
-        # LOOP 1: Stream ages one by one
-        while True:
-            row = cursor.fetchone()
-            if row is None:
-                break
-            yield row[0]  # Yield just the age value
+        # Check out a pooled connection to ALX_prodev (returned on exit)
+        with get_pool().connection() as connection:
+            # Execute query to get only ages through an unbuffered (server-side) cursor
+            query = "SELECT age FROM user_data"
+            
+            # LOOP 1: Stream ages one by one from each fetched block
+            for rows in stream_query(connection, query):
+                yield from (row[0] for row in rows)  # Yield just the age values
             
     except Error as e:
         print(f"Database error: {e}")
         raise
-    finally:
-        # Clean up resources
-        if cursor:
-            cursor.close()
-        if db_manager:
-            db_manager.close_connection()
 
-def calculate_average_age() -> float:
+def calculate_average_age(push_down: bool = True) -> float:
     """
-    Calculates the average age of all users using the generator.
-    Processes ages one by one without loading entire dataset into memory.
+    Calculates the average age of all users.
+    By default the average is pushed down to MySQL so a single number crosses
+    the network; with push_down=False the ages are streamed through the
+    generator and reduced in Python without loading the dataset into memory.
+    
+    Args:
+        push_down: Compute AVG(age) in SQL instead of streaming every age
     
     Returns:
         Float representing the average age
     """
-    total_age = 0
-    user_count = 0
-    
-    # LOOP 2: Process ages from generator
-    for age in stream_user_ages():
-        total_age += age
-        user_count += 1
+    # LOOP 2 (fallback only): the streaming reducer consumes the generator
+    source = None if push_down else stream_user_ages()
+    average_age = aggregate(source, metrics=['avg'])['avg']
     
-    # Calculate average (handle division by zero)
-    if user_count == 0:
+    # Handle the empty table (AVG is NULL / no ages streamed)
+    if average_age is None:
         return 0.0
     
-    average_age = total_age / user_count
     return average_age
@@ -0,0 +1,195 @@
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Union
+
+from seed import Error, get_pool
+
+# Metrics understood by both the SQL push-down and the streaming reducer
+METRICS = ('count', 'sum', 'avg', 'min', 'max')
+
+# Columns of user_data that can be aggregated numerically in SQL
+NUMERIC_COLUMNS = ('age',)
+
+Number = Union[int, float]
+
+
+def _to_number(value: Any) -> Optional[Number]:
+    """
+    Converts DECIMAL results from MySQL into plain int/float values
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+class StreamingAggregate:
+    """
+    Running count/sum/min/max over a stream of numbers.
+    Uses constant memory and can be merged with another instance, so partial
+    results computed over separate streams can be combined.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value: Number) -> None:
+        """
+        Adds one value to the aggregate
+        """
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: 'StreamingAggregate') -> 'StreamingAggregate':
+        """
+        Folds another aggregate into this one and returns self
+        """
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def result(self, metrics: Sequence[str] = METRICS) -> Dict[str, Optional[Number]]:
+        """
+        Returns the requested metrics; avg/min/max are None for an empty stream
+        """
+        values = {
+            'count': self.count,
+            'sum': _to_number(self.sum),
+            'avg': float(self.sum) / self.count if self.count else None,
+            'min': _to_number(self.min),
+            'max': _to_number(self.max),
+        }
+        return {metric: values[metric] for metric in metrics}
+
+
+def _validate(metrics: Sequence[str], bucket_size: Optional[int]) -> None:
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics {unknown}, expected a subset of {METRICS}")
+    if bucket_size is not None and bucket_size < 1:
+        raise ValueError("bucket_size must be at least 1")
+
+
+def aggregate_sql(metrics: Sequence[str] = METRICS, column: str = 'age',
+                  bucket_size: Optional[int] = None) -> Dict[Any, Any]:
+    """
+    Push-down path: computes the metrics inside MySQL so only the result
+    crosses the network.
+
+    Args:
+        metrics: Subset of METRICS to compute
+        column: Numeric user_data column to aggregate
+        bucket_size: When set, group rows by FLOOR(column / bucket_size) * bucket_size
+
+    Returns:
+        {metric: value}, or {bucket_start: {metric: value}} when bucketed
+    """
+    _validate(metrics, bucket_size)
+    if column not in NUMERIC_COLUMNS:
+        raise ValueError(f"Column {column!r} cannot be aggregated, expected one of {NUMERIC_COLUMNS}")
+
+    # Column and metric names come from the whitelists above, never from user input.
+    # AVG is derived from SUM and COUNT in Python: MySQL rounds AVG over a
+    # DECIMAL column to 4 decimals, which would differ from the streamed path.
+    select = ", ".join(
+        f"SUM({column}) AS `avg_sum`, COUNT({column}) AS `avg_count`" if metric == 'avg'
+        else f"{metric.upper()}({column}) AS `{metric}`"
+        for metric in metrics
+    )
+    params = ()
+    if bucket_size is None:
+        query = f"SELECT {select} FROM user_data"
+    else:
+        query = (
+            f"SELECT FLOOR({column} / %s) * %s AS bucket, {select} "
+            "FROM user_data GROUP BY bucket ORDER BY bucket"
+        )
+        params = (bucket_size, bucket_size)
+
+    try:
+        with get_pool().connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+    except Error as e:
+        print(f"Database error in aggregate_sql: {e}")
+        raise
+
+    def convert(row: Dict[str, Any]) -> Dict[str, Optional[Number]]:
+        result = {}
+        for metric in metrics:
+            if metric == 'avg':
+                # Same formula as StreamingAggregate.result
+                count = row['avg_count']
+                result[metric] = float(row['avg_sum']) / count if count else None
+            else:
+                result[metric] = _to_number(row[metric])
+        return result
+
+    if bucket_size is None:
+        return convert(rows[0])
+    return {_to_number(row['bucket']): convert(row) for row in rows}
+
+
+def aggregate_stream(values: Iterable[Any], metrics: Sequence[str] = METRICS,
+                     bucket_size: Optional[int] = None,
+                     key: Optional[Callable[[Any], Number]] = None) -> Dict[Any, Any]:
+    """
+    Fallback path: reduces any generator in Python with constant memory
+    (one StreamingAggregate, or one per bucket).
+
+    Args:
+        values: Iterable of numbers, or of rows when key is given
+        metrics: Subset of METRICS to compute
+        bucket_size: When set, group values into buckets of this width
+        key: Extracts the number from each item (e.g. lambda user: user['age'])
+
+    Returns:
+        Same shape as aggregate_sql
+    """
+    _validate(metrics, bucket_size)
+
+    if bucket_size is None:
+        total = StreamingAggregate()
+        for item in values:
+            total.add(key(item) if key else item)
+        return total.result(metrics)
+
+    buckets: Dict[Number, StreamingAggregate] = {}
+    for item in values:
+        value = key(item) if key else item
+        bucket = (value // bucket_size) * bucket_size
+        if bucket not in buckets:
+            buckets[bucket] = StreamingAggregate()
+        buckets[bucket].add(value)
+    return {_to_number(bucket): buckets[bucket].result(metrics) for bucket in sorted(buckets)}
+
+
+def aggregate(source: Optional[Iterable[Any]] = None, metrics: Sequence[str] = METRICS,
+              column: str = 'age', bucket_size: Optional[int] = None,
+              key: Optional[Callable[[Any], Number]] = None) -> Dict[Any, Any]:
+    """
+    Single entry point for both aggregation paths.
+    Without a source the work is pushed down to SQL; with a source (any
+    generator, e.g. stream_user_ages()) it is reduced in Python.
+
+    Example:
+        aggregate(metrics=['avg'])                     # one row over the wire
+        aggregate(stream_user_ages(), metrics=['avg'])  # streamed fallback
+        aggregate(bucket_size=10)                      # age histogram by decade
+    """
+    if source is None:
+        return aggregate_sql(metrics, column, bucket_size)
+    return aggregate_stream(source, metrics, bucket_size, key)
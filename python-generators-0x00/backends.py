@@ -0,0 +1,606 @@
+import math
+import os
+import sqlite3
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import mysql.connector
+    from mysql.connector import Error as MySQLError
+except ImportError:  # SQLite-only machines do not need the MySQL driver
+    mysql = None
+
+    class MySQLError(Exception):
+        """
+        Placeholder so `except DB_ERRORS` works without mysql.connector installed
+        """
+
+# Errors raised by any backend; use in `except DB_ERRORS as e:` clauses
+DB_ERRORS = (MySQLError, sqlite3.Error)
+
+# Name of the database (MySQL) or default file stem (SQLite)
+DATABASE_NAME = 'ALX_prodev'
+
+# Storage of user_id:
+#   'uuid'   - VARCHAR(36) canonical strings (the original schema)
+#   'binary' - BINARY(16), less than half the key size in the table and every
+#              index; byte order equals string order, so ORDER BY and range
+#              scans on user_id behave exactly as before
+KEY_FORMATS = ('uuid', 'binary')
+
+
+def encode_key(value: Any) -> Any:
+    """
+    Converts a canonical UUID string to its 16 bytes; other values pass through
+    """
+    if isinstance(value, str) and len(value) == 36 and value[8] == '-':
+        try:
+            return bytes.fromhex(value.replace('-', ''))
+        except ValueError:
+            return value
+    return value
+
+
+def decode_key(value: Any) -> Any:
+    """
+    Converts 16 stored bytes back to a canonical UUID string
+    """
+    if isinstance(value, (bytes, bytearray)) and len(value) == 16:
+        # Same text as str(uuid.UUID(bytes=value)), several times faster
+        digits = value.hex()
+        return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+    return value
+
+
+class BinaryKeyCursor:
+    """
+    Cursor proxy used when user_id is stored as BINARY(16): user_id result
+    values come back as strings, so callers keep working with string UUIDs.
+    Parameters are sent unchanged; code binding a user_id converts it with
+    the backend's key_param(), so a name or email that happens to look like
+    a UUID is never stored as bytes.
+    """
+
+    def __init__(self, cursor: Any, dictionary: bool = False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def _convert(self, rows: List[Any]) -> List[Any]:
+        if not rows or not self._cursor.description:
+            return rows
+        if self._dictionary:
+            for row in rows:
+                if 'user_id' in row:
+                    row['user_id'] = decode_key(row['user_id'])
+            return rows
+        names = [column[0] for column in self._cursor.description]
+        if 'user_id' not in names:
+            return rows
+        index = names.index('user_id')
+        return [row[:index] + (decode_key(row[index]),) + row[index + 1:] for row in rows]
+
+    def fetchone(self) -> Optional[Any]:
+        row = self._cursor.fetchone()
+        if row is None:
+            return None
+        return self._convert([row])[0]
+
+    def fetchmany(self, size: int = 1) -> List[Any]:
+        return self._convert(self._cursor.fetchmany(size))
+
+    def fetchall(self) -> List[Any]:
+        return self._convert(self._cursor.fetchall())
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class BinaryKeyConnection:
+    """
+    Connection proxy handing out BinaryKeyCursor objects
+    """
+
+    def __init__(self, connection: Any):
+        self._connection = connection
+
+    def cursor(self, *args: Any, dictionary: bool = False, **kwargs: Any) -> BinaryKeyCursor:
+        return BinaryKeyCursor(self._connection.cursor(*args, dictionary=dictionary, **kwargs), dictionary)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+
+class LocalInfileUnavailable(Exception):
+    """
+    Raised by load_infile when the backend, client or server does not allow
+    LOAD DATA LOCAL INFILE; callers fall back to batched INSERTs
+    """
+
+
+def _key_format_from_env(key_format: Optional[str]) -> str:
+    key_format = (key_format or os.environ.get('USER_ID_FORMAT', 'uuid')).lower()
+    if key_format not in KEY_FORMATS:
+        raise ValueError(f"Unknown USER_ID_FORMAT {key_format!r}, expected one of {KEY_FORMATS}")
+    return key_format
+
+
+class MySQLBackend:
+    """
+    MySQL storage backend using mysql.connector.
+    Credentials default to the historical localhost/root setup and can be
+    overridden with MYSQL_HOST, MYSQL_USER and MYSQL_PASSWORD; USER_ID_FORMAT
+    selects the user_id storage (see KEY_FORMATS). MYSQL_LOCAL_INFILE=1 lets
+    connections send files for LOAD DATA LOCAL INFILE; it is off by default
+    because the server can then request any file the client can read.
+    """
+    name = 'mysql'
+    # Placeholders allowed in one statement by the MySQL protocol
+    max_params = 65535
+    # Client and server error numbers meaning LOAD DATA LOCAL is disabled
+    LOCAL_INFILE_ERRNOS = (1148, 2068, 3948, 3950)
+    # Converts a canonical UUID string column to BINARY(16)
+    UUID_TO_BINARY_SQL = "UNHEX(REPLACE({column}, '-', ''))"
+
+    def __init__(self, host: Optional[str] = None, user: Optional[str] = None,
+                 password: Optional[str] = None, database: str = DATABASE_NAME,
+                 key_format: Optional[str] = None, local_infile: Optional[bool] = None):
+        self.host = host or os.environ.get('MYSQL_HOST', 'localhost')
+        self.user = user or os.environ.get('MYSQL_USER', 'root')
+        self.password = password if password is not None else os.environ.get('MYSQL_PASSWORD', '')
+        self.database = database
+        self.key_format = _key_format_from_env(key_format)
+        if local_infile is None:
+            local_infile = os.environ.get('MYSQL_LOCAL_INFILE', '') in ('1', 'true', 'yes')
+        self.local_infile = local_infile
+
+    def _require_driver(self) -> None:
+        if mysql is None:
+            raise RuntimeError("mysql-connector-python is not installed; use the SQLite backend")
+
+    def connect_server(self) -> Any:
+        """
+        Connects to the MySQL server without selecting a database
+        """
+        self._require_driver()
+        return mysql.connector.connect(host=self.host, user=self.user, password=self.password)
+
+    def connect(self) -> Any:
+        """
+        Connects to the ALX_prodev database
+        """
+        self._require_driver()
+        connection = mysql.connector.connect(
+            host=self.host, user=self.user, password=self.password, database=self.database,
+            allow_local_infile=self.local_infile
+        )
+        return BinaryKeyConnection(connection) if self.key_format == 'binary' else connection
+
+    def key_param(self, value: Any) -> Any:
+        """
+        Converts a value bound to user_id into its stored form (16 bytes in
+        the 'binary' key format, unchanged otherwise)
+        """
+        return encode_key(value) if self.key_format == 'binary' else value
+
+    def create_database(self, cursor: Any) -> None:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.database}")
+
+    @staticmethod
+    def _table_ddl(table: str, key_format: str) -> str:
+        if key_format == 'binary':
+            # The clustered primary key already indexes user_id
+            key_column, key_index = "user_id BINARY(16) PRIMARY KEY", ""
+        else:
+            key_column, key_index = "user_id VARCHAR(36) PRIMARY KEY", "INDEX idx_user_id (user_id),"
+        return f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {key_column},
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) NOT NULL,
+                age DECIMAL(3,0) NOT NULL,
+                updated_at TIMESTAMP(6) NOT NULL
+                    DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+                {key_index}
+                INDEX idx_age (age),
+                INDEX idx_updated_at (updated_at, user_id)
+            )
+        """
+
+    def create_table(self, cursor: Any, check_key_format: bool = True) -> None:
+        """
+        Creates user_data and adds idx_age / updated_at to older tables.
+        Warns when the table's user_id format differs from key_format,
+        unless check_key_format is False.
+        """
+        cursor.execute(self._table_ddl('user_data', self.key_format))
+        # Tables created before these existed do not get them from IF NOT EXISTS
+        if not self.index_exists(cursor, 'user_data', 'idx_age'):
+            cursor.execute("CREATE INDEX idx_age ON user_data (age)")
+            print("Index idx_age added to user_data")
+        if not self.column_exists(cursor, 'user_data', 'updated_at'):
+            cursor.execute("""
+                ALTER TABLE user_data
+                ADD COLUMN updated_at TIMESTAMP(6) NOT NULL
+                    DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+                ADD INDEX idx_updated_at (updated_at, user_id)
+            """)
+            print("Column updated_at added to user_data")
+        if check_key_format:
+            _check_key_format(self, cursor)
+
+    def key_format_of(self, cursor: Any) -> str:
+        """
+        Returns the KEY_FORMATS entry matching the stored user_id column
+        """
+        cursor.execute("""
+            SELECT DATA_TYPE FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = 'user_data' AND column_name = 'user_id'
+        """)
+        return 'binary' if cursor.fetchone()[0].lower() == 'binary' else 'uuid'
+
+    def migrate_key_format(self, cursor: Any, key_format: str) -> bool:
+        """
+        Rebuilds user_data with user_id stored in `key_format`, copying every
+        row, then swaps the tables with one atomic RENAME TABLE. Migrating to
+        'binary' also drops the redundant idx_user_id.
+
+        Returns:
+            False if the table already uses `key_format`
+        """
+        if self.key_format_of(cursor) == key_format:
+            return False
+        if key_format == 'binary':
+            key = self.UUID_TO_BINARY_SQL.format(column='user_id')
+        else:
+            # BIN_TO_UUID() needs MySQL 8; this works on 5.7 as well
+            key = ("LOWER(CONCAT_WS('-', SUBSTR(HEX(user_id), 1, 8), SUBSTR(HEX(user_id), 9, 4), "
+                   "SUBSTR(HEX(user_id), 13, 4), SUBSTR(HEX(user_id), 17, 4), SUBSTR(HEX(user_id), 21)))")
+        cursor.execute("DROP TABLE IF EXISTS user_data_migrating")
+        cursor.execute(self._table_ddl('user_data_migrating', key_format))
+        cursor.execute(f"""
+            INSERT INTO user_data_migrating (user_id, name, email, age, updated_at)
+            SELECT {key}, name, email, age, updated_at FROM user_data
+        """)
+        cursor.execute("RENAME TABLE user_data TO user_data_premigration, user_data_migrating TO user_data")
+        cursor.execute("DROP TABLE user_data_premigration")
+        return True
+
+    def load_infile(self, cursor: Any, path: str, on_duplicate: str) -> Tuple[int, int]:
+        """
+        Imports a normalized CSV (header line, then user_id,name,email,age
+        rows) with LOAD DATA LOCAL INFILE into a session-private staging
+        table, then merges it into user_data with one INSERT ... SELECT using
+        the given duplicate policy. The caller commits.
+
+        Returns:
+            (rows staged, rows reported as affected by the merge)
+
+        Raises:
+            LocalInfileUnavailable: if the client or server refuses local infile
+        """
+        if not self.local_infile:
+            raise LocalInfileUnavailable("set MYSQL_LOCAL_INFILE=1 to allow LOAD DATA LOCAL INFILE")
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS user_data_staging")
+        cursor.execute("""
+            CREATE TEMPORARY TABLE user_data_staging (
+                user_id VARCHAR(36) NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) NOT NULL,
+                age DECIMAL(3,0) NOT NULL
+            )
+        """)
+        try:
+            try:
+                cursor.execute("""
+                    LOAD DATA LOCAL INFILE %s INTO TABLE user_data_staging
+                    CHARACTER SET utf8mb4
+                    FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+                    LINES TERMINATED BY '\\n'
+                    IGNORE 1 LINES
+                    (user_id, name, email, age)
+                """, (path,))
+            except MySQLError as e:
+                if getattr(e, 'errno', None) in self.LOCAL_INFILE_ERRNOS:
+                    raise LocalInfileUnavailable(str(e)) from e
+                raise
+            staged = cursor.rowcount
+
+            columns = ('user_id', 'name', 'email', 'age')
+            key = self.UUID_TO_BINARY_SQL.format(column='user_id') if self.key_format == 'binary' else 'user_id'
+            select = f"SELECT {key}, name, email, age FROM user_data_staging"
+            if on_duplicate == 'ignore':
+                cursor.execute(f"INSERT IGNORE INTO user_data ({', '.join(columns)}) {select}")
+            else:
+                updates = ", ".join(f"{column} = VALUES({column})" for column in columns if column != 'user_id')
+                cursor.execute(
+                    f"INSERT INTO user_data ({', '.join(columns)}) {select} ON DUPLICATE KEY UPDATE {updates}"
+                )
+            return staged, cursor.rowcount
+        finally:
+            cursor.execute("DROP TEMPORARY TABLE IF EXISTS user_data_staging")
+
+    def index_exists(self, cursor: Any, table: str, index: str) -> bool:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (table, index))
+        return cursor.fetchone()[0] > 0
+
+    def column_exists(self, cursor: Any, table: str, column: str) -> bool:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        """, (table, column))
+        return cursor.fetchone()[0] > 0
+
+    def insert_rows_sql(self, columns: Tuple[str, ...], row_count: int, on_duplicate: str) -> str:
+        """
+        Builds a multi-row INSERT for user_data with the given duplicate policy
+        """
+        row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        values = ", ".join([row] * row_count)
+        column_list = ", ".join(columns)
+        if on_duplicate == 'ignore':
+            return f"INSERT IGNORE INTO user_data ({column_list}) VALUES {values}"
+        updates = ", ".join(f"{column} = VALUES({column})" for column in columns if column != 'user_id')
+        return f"INSERT INTO user_data ({column_list}) VALUES {values} ON DUPLICATE KEY UPDATE {updates}"
+
+
+class SQLiteCursor:
+    """
+    Wraps a sqlite3 cursor with the mysql.connector cursor API used in this
+    project: %s placeholders and optional dictionary rows. sqlite3 steps the
+    statement lazily, so fetchmany() already streams without buffering.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool = False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @staticmethod
+    def _translate(query: str) -> str:
+        # mysql.connector uses pyformat-style %s; sqlite3 uses qmark-style ?
+        return query.replace('%s', '?')
+
+    def _convert(self, rows: List[Tuple[Any, ...]]) -> List[Any]:
+        if not self._dictionary:
+            return rows
+        names = [column[0] for column in self._cursor.description]
+        return [dict(zip(names, row)) for row in rows]
+
+    def execute(self, query: str, params: Iterable[Any] = ()) -> None:
+        self._cursor.execute(self._translate(query), tuple(params or ()))
+
+    def executemany(self, query: str, seq_params: Iterable[Iterable[Any]]) -> None:
+        self._cursor.executemany(self._translate(query), seq_params)
+
+    def fetchone(self) -> Optional[Any]:
+        row = self._cursor.fetchone()
+        if row is None:
+            return None
+        return self._convert([row])[0]
+
+    def fetchmany(self, size: int = 1) -> List[Any]:
+        return self._convert(self._cursor.fetchmany(size))
+
+    def fetchall(self) -> List[Any]:
+        return self._convert(self._cursor.fetchall())
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def description(self) -> Any:
+        return self._cursor.description
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    Wraps a sqlite3 connection with the subset of the mysql.connector
+    connection API used by DatabaseManager, ConnectionPool and the generators
+    """
+    # sqlite3 never leaves unread results that block the connection
+    unread_result = False
+
+    def __init__(self, path: str):
+        # Pooled connections may be checked out from prefetch threads
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # MySQL functions used by the generator modules
+        self._connection.create_function('CRC32', 1, lambda value: zlib.crc32(str(value).encode('utf-8')),
+                                         deterministic=True)
+        self._connection.create_function('MOD', 2, lambda a, b: None if a is None or b is None else a % b,
+                                         deterministic=True)
+        self._connection.create_function('FLOOR', 1, lambda value: None if value is None else math.floor(value),
+                                         deterministic=True)
+        # Used by SQLiteBackend.migrate_key_format
+        self._connection.create_function('UUID_TO_BIN', 1, encode_key, deterministic=True)
+        self._connection.create_function('BIN_TO_UUID', 1, decode_key, deterministic=True)
+        self._open = True
+
+    def cursor(self, buffered: Optional[bool] = None, dictionary: bool = False) -> SQLiteCursor:
+        return SQLiteCursor(self._connection.cursor(), dictionary)
+
+    def is_connected(self) -> bool:
+        if not self._open:
+            return False
+        try:
+            self._connection.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def consume_results(self) -> None:
+        pass
+
+    def commit(self) -> None:
+        self._connection.commit()
+
+    def rollback(self) -> None:
+        self._connection.rollback()
+
+    def close(self) -> None:
+        self._open = False
+        self._connection.close()
+
+
+class SQLiteBackend:
+    """
+    SQLite storage backend: a single file, no server required.
+    Lets every generator pipeline run and be benchmarked offline.
+    """
+    name = 'sqlite'
+    # SQLITE_MAX_VARIABLE_NUMBER for builds older than 3.32
+    max_params = 999
+
+    def __init__(self, path: Optional[str] = None, key_format: Optional[str] = None):
+        self.path = path or os.environ.get('SQLITE_PATH', f'{DATABASE_NAME}.sqlite3')
+        self.key_format = _key_format_from_env(key_format)
+
+    def connect_server(self) -> Any:
+        return self.connect()
+
+    def connect(self) -> Any:
+        connection = SQLiteConnection(self.path)
+        return BinaryKeyConnection(connection) if self.key_format == 'binary' else connection
+
+    def key_param(self, value: Any) -> Any:
+        """
+        Converts a value bound to user_id into its stored form (16 bytes in
+        the 'binary' key format, unchanged otherwise)
+        """
+        return encode_key(value) if self.key_format == 'binary' else value
+
+    def create_database(self, cursor: Any) -> None:
+        # The database file is created on connect
+        pass
+
+    @staticmethod
+    def _table_ddl(table: str, key_format: str) -> str:
+        # BINARY(16) gets BLOB affinity; WITHOUT ROWID clusters rows on the
+        # key instead of keeping a separate primary key index beside the rowid
+        key_type, options = ("BINARY(16)", " WITHOUT ROWID") if key_format == 'binary' else ("VARCHAR(36)", "")
+        return f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                user_id {key_type} PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) NOT NULL,
+                age DECIMAL(3,0) NOT NULL,
+                updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+            ){options}
+        """
+
+    def create_table(self, cursor: Any, check_key_format: bool = True) -> None:
+        cursor.execute(self._table_ddl('user_data', self.key_format))
+        if not self.column_exists(cursor, 'user_data', 'updated_at'):
+            # ALTER TABLE only accepts constant defaults, so inserts into a
+            # migrated table get their timestamp from a trigger instead
+            cursor.execute(
+                "ALTER TABLE user_data ADD COLUMN updated_at TEXT NOT NULL DEFAULT '1970-01-01 00:00:00.000'"
+            )
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS user_data_inserted_at AFTER INSERT ON user_data
+                BEGIN
+                    UPDATE user_data SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                    WHERE user_id = NEW.user_id;
+                END
+            """)
+            print("Column updated_at added to user_data")
+        # Equivalent of MySQL's ON UPDATE CURRENT_TIMESTAMP, which only fires
+        # when a value actually changes. Recreated so tables built with the
+        # older unconditional trigger pick up the WHEN clause.
+        cursor.execute("DROP TRIGGER IF EXISTS user_data_updated_at")
+        cursor.execute("""
+            CREATE TRIGGER user_data_updated_at AFTER UPDATE OF user_id, name, email, age ON user_data
+            WHEN OLD.user_id IS NOT NEW.user_id OR OLD.name IS NOT NEW.name
+                OR OLD.email IS NOT NEW.email OR OLD.age IS NOT NEW.age
+            BEGIN
+                UPDATE user_data SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                WHERE user_id = NEW.user_id;
+            END
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_age ON user_data (age)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_updated_at ON user_data (updated_at, user_id)")
+        if check_key_format:
+            _check_key_format(self, cursor)
+
+    def load_infile(self, cursor: Any, path: str, on_duplicate: str) -> Tuple[int, int]:
+        raise LocalInfileUnavailable("SQLite has no LOAD DATA LOCAL INFILE")
+
+    def key_format_of(self, cursor: Any) -> str:
+        cursor.execute("PRAGMA table_info(user_data)")
+        types = {row[1]: row[2].upper() for row in cursor.fetchall()}
+        return 'binary' if types.get('user_id') == 'BINARY(16)' else 'uuid'
+
+    def migrate_key_format(self, cursor: Any, key_format: str) -> bool:
+        """
+        Rebuilds user_data with user_id stored in `key_format` (see
+        MySQLBackend.migrate_key_format), then recreates triggers and indexes
+        """
+        if self.key_format_of(cursor) == key_format:
+            return False
+        key = "UUID_TO_BIN(user_id)" if key_format == 'binary' else "BIN_TO_UUID(user_id)"
+        cursor.execute("DROP TABLE IF EXISTS user_data_migrating")
+        cursor.execute(self._table_ddl('user_data_migrating', key_format))
+        cursor.execute(f"""
+            INSERT INTO user_data_migrating (user_id, name, email, age, updated_at)
+            SELECT {key}, name, email, age, updated_at FROM user_data
+        """)
+        # Dropping the old table also drops its triggers and indexes
+        cursor.execute("DROP TABLE user_data")
+        cursor.execute("ALTER TABLE user_data_migrating RENAME TO user_data")
+        # The new format may differ from USER_ID_FORMAT on purpose
+        self.create_table(cursor, check_key_format=False)
+        return True
+
+    def index_exists(self, cursor: Any, table: str, index: str) -> bool:
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+            (table, index)
+        )
+        return cursor.fetchone()[0] > 0
+
+    def column_exists(self, cursor: Any, table: str, column: str) -> bool:
+        # PRAGMA arguments cannot be bound, table names come from this module only
+        cursor.execute(f"PRAGMA table_info({table})")
+        return any(row[1] == column for row in cursor.fetchall())
+
+    def insert_rows_sql(self, columns: Tuple[str, ...], row_count: int, on_duplicate: str) -> str:
+        row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        values = ", ".join([row] * row_count)
+        column_list = ", ".join(columns)
+        if on_duplicate == 'ignore':
+            return f"INSERT OR IGNORE INTO user_data ({column_list}) VALUES {values}"
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != 'user_id')
+        return (
+            f"INSERT INTO user_data ({column_list}) VALUES {values} "
+            f"ON CONFLICT(user_id) DO UPDATE SET {updates}"
+        )
+
+
+def _check_key_format(backend: Any, cursor: Any) -> None:
+    stored = backend.key_format_of(cursor)
+    if stored != backend.key_format:
+        print(
+            f"Warning: user_data stores user_id as {stored!r} but USER_ID_FORMAT is {backend.key_format!r}; "
+            f"run DatabaseManager.migrate_user_ids() before using the table"
+        )
+
+
+BACKENDS: Dict[str, type] = {
+    'mysql': MySQLBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+def backend_from_env() -> Any:
+    """
+    Builds the backend named by DB_BACKEND ('mysql' by default)
+    """
+    name = os.environ.get('DB_BACKEND', 'mysql').lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown DB_BACKEND {name!r}, expected one of {tuple(BACKENDS)}")
+    return BACKENDS[name]()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the python-generators-0x00 streaming functions.
+
+Builds a deterministic synthetic user_data table of the requested size in a
+scratch database (see scratch_backend; the real user_data is never touched), then
+runs stream_users, stream_users_in_batches, lazy_paginate and
+calculate_average_age for every batch size, each case in a fresh process.
+For every case it reports rows/sec, time-to-first-row, peak RSS and the
+number of database round trips (statements executed + fetch calls), plus
+the counters and per-query latency summaries of instrumentation.MemoryCollector.
+Results are written as JSON so runs on different commits can be diffed.
+
+Usage:
+    python3 benchmark.py --rows 100000 --batch-sizes 100,1000,10000 \
+        --backend sqlite --output results.json [--compare previous.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from queue import Empty
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+import seed
+from backends import BACKENDS, DATABASE_NAME, MySQLBackend, SQLiteBackend
+from instrumentation import MemoryCollector, set_instrumentation
+from seed import DatabaseManager, chunked, get_pool
+
+# Seed of the synthetic data set; the same seed and row count give the same table
+DATA_SEED = 20240101
+
+FIRST_NAMES = ('Alice', 'Bob', 'Carol', 'Dave', 'Eve', 'Frank', 'Grace', 'Heidi', 'Ivan', 'Judy')
+LAST_NAMES = ('Smith', 'Johnson', 'Brown', 'Taylor', 'Lee', 'Walker', 'Young', 'King', 'Wright', 'Green')
+DOMAINS = ('example.com', 'mail.com', 'test.org', 'alx.dev', 'prodev.io')
+
+
+def synthetic_users(count: int, data_seed: int = DATA_SEED) -> Generator[Tuple[str, str, str, int], None, None]:
+    """
+    Yields `count` deterministic (user_id, name, email, age) tuples.
+    A table of N rows is always a prefix of a table of M > N rows.
+    """
+    rng = random.Random(data_seed)
+    for index in range(count):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        email = f"{first.lower()}.{last.lower()}{index}@{rng.choice(DOMAINS)}"
+        yield user_id, f"{first} {last}", email, rng.randint(18, 100)
+
+
+# How often run_benchmarks checks that a case process is still alive
+CASE_POLL_SECONDS = 1.0
+
+# Suffix of the scratch database the benchmarks fill with synthetic rows
+SCRATCH_SUFFIX = 'bench'
+
+
+def scratch_backend(base: Any, suffix: str = SCRATCH_SUFFIX, key_format: Optional[str] = None) -> Any:
+    """
+    Builds a backend like `base` pointing at a separate database: a
+    `<SQLITE_PATH>.<suffix>` file for SQLite, an `ALX_prodev_<suffix>`
+    database on the same server for MySQL
+    """
+    key_format = key_format or base.key_format
+    if base.name == 'sqlite':
+        return SQLiteBackend(f"{base.path}.{suffix}", key_format=key_format)
+    return MySQLBackend(base.host, base.user, base.password, f"{DATABASE_NAME}_{suffix}", key_format)
+
+
+def use_scratch_backend(suffix: str = SCRATCH_SUFFIX, key_format: Optional[str] = None) -> Any:
+    """
+    Creates the scratch database if needed and routes seed (and so every
+    generator) to it, so benchmarks can insert and delete synthetic rows
+    without touching the real user_data table
+
+    Returns:
+        The scratch backend
+    """
+    backend = scratch_backend(seed.get_backend(), suffix, key_format)
+    seed.set_backend(backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db_manager = DatabaseManager(backend)
+        server = db_manager.connect_db()
+        db_manager.create_database(server)
+        server.close()
+    return backend
+
+
+def prepare_dataset(rows: int, batch_size: int = 5000) -> None:
+    """
+    Makes the scratch user_data hold exactly the synthetic data set of
+    `rows` rows, rebuilding it when the row count differs
+    """
+    db_manager = DatabaseManager(use_scratch_backend())
+    with get_pool().connection() as connection:
+        db_manager.create_table(connection)
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        existing = cursor.fetchone()[0]
+        if existing == rows:
+            cursor.close()
+            return
+        print(f"Building synthetic user_data with {rows} rows...")
+        cursor.execute("DELETE FROM user_data")
+        cursor.close()
+        for chunk in chunked(synthetic_users(rows), batch_size):
+            db_manager.insert_batch(connection, chunk)
+            connection.commit()
+
+
+class _RoundTrips:
+    count = 0
+
+
+class CountingCursor:
+    """
+    Cursor proxy counting statements and fetch calls as round trips
+    """
+
+    def __init__(self, cursor: Any):
+        self._cursor = cursor
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        _RoundTrips.count += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def fetchone(self) -> Any:
+        _RoundTrips.count += 1
+        return self._cursor.fetchone()
+
+    def fetchmany(self, *args: Any, **kwargs: Any) -> Any:
+        _RoundTrips.count += 1
+        return self._cursor.fetchmany(*args, **kwargs)
+
+    def fetchall(self) -> Any:
+        _RoundTrips.count += 1
+        return self._cursor.fetchall()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class CountingConnection:
+    """
+    Connection proxy handing out CountingCursor objects
+    """
+
+    def __init__(self, connection: Any):
+        self._connection = connection
+
+    def cursor(self, *args: Any, **kwargs: Any) -> CountingCursor:
+        return CountingCursor(self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+
+class CountingBackend:
+    """
+    Backend proxy whose connections count round trips
+    """
+
+    def __init__(self, backend: Any):
+        self._backend = backend
+
+    def connect(self) -> CountingConnection:
+        return CountingConnection(self._backend.connect())
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._backend, name)
+
+
+def _cases(batch_sizes: List[int]) -> List[Tuple[str, str, Optional[int]]]:
+    """
+    Lists (function, variant, batch_size) for every benchmark case
+    """
+    cases = []
+    for batch_size in batch_sizes:
+        cases.append(('stream_users', 'fetch_size', batch_size))
+        cases.append(('stream_users_in_batches', 'batch_size', batch_size))
+        cases.append(('lazy_paginate', 'offset', batch_size))
+        cases.append(('lazy_paginate', 'keyset', batch_size))
+    cases.append(('calculate_average_age', 'push_down', None))
+    cases.append(('calculate_average_age', 'streamed', None))
+    return cases
+
+
+def _iterate(function: str, variant: str, batch_size: Optional[int]) -> Generator[int, None, None]:
+    """
+    Runs one case and yields the number of rows produced by each step
+    """
+    if function == 'stream_users':
+        for _ in __import__('0-stream_users').stream_users(batch_size):
+            yield 1
+    elif function == 'stream_users_in_batches':
+        for batch in __import__('1-batch_processing').stream_users_in_batches(batch_size):
+            yield len(batch)
+    elif function == 'lazy_paginate':
+        for page in __import__('2-lazy_paginate').lazy_paginate(batch_size, mode=variant):
+            yield len(page)
+    else:
+        stream_ages = __import__('4-stream_ages')
+        stream_ages.calculate_average_age(push_down=variant == 'push_down')
+        yield 1
+
+
+def _run_case(backend: Any, case: Tuple[str, str, Optional[int]], results: multiprocessing.Queue) -> None:
+    """
+    Child process entry point: runs one case and puts its metrics on `results`
+    """
+    seed.set_backend(CountingBackend(backend))
+    function, variant, batch_size = case
+
+    rows = 0
+    first_row = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Warm the pool so connection setup is not charged to the case
+        with get_pool().connection():
+            pass
+        _RoundTrips.count = 0
+        collector = MemoryCollector()
+        set_instrumentation(collector)
+
+        start = time.perf_counter()
+        for produced in _iterate(function, variant, batch_size):
+            if first_row is None:
+                first_row = time.perf_counter() - start
+            rows += produced
+        elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak_rss //= 1024
+    results.put({
+        'function': function,
+        'variant': variant,
+        'batch_size': batch_size,
+        'rows': rows,
+        'seconds': round(elapsed, 6),
+        'rows_per_sec': round(rows / elapsed, 1) if elapsed else None,
+        'time_to_first_row': round(first_row, 6) if first_row is not None else None,
+        'peak_rss_kib': peak_rss,
+        'round_trips': _RoundTrips.count,
+        'metrics': collector.snapshot(),
+    })
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _case_result(process: Any, results: multiprocessing.Queue) -> Optional[Dict[str, Any]]:
+    """
+    Waits for the result of a case process, or returns None once the process
+    exited without putting one (crash, import or database error, OOM kill)
+    """
+    while True:
+        try:
+            return results.get(timeout=CASE_POLL_SECONDS)
+        except Empty:
+            if not process.is_alive():
+                # The result may have been flushed right before the exit
+                try:
+                    return results.get(timeout=CASE_POLL_SECONDS)
+                except Empty:
+                    return None
+
+
+def run_benchmarks(rows: int, batch_sizes: List[int]) -> Dict[str, Any]:
+    """
+    Prepares the data set and runs every case in its own spawned process
+    """
+    prepare_dataset(rows)
+    backend = seed.get_backend()
+    get_pool().close_all()
+
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    results = []
+    for case in _cases(batch_sizes):
+        process = context.Process(target=_run_case, args=(backend, case, queue))
+        process.start()
+        result = _case_result(process, queue)
+        process.join()
+        if result is None:
+            function, variant, batch_size = case
+            result = {
+                'function': function,
+                'variant': variant,
+                'batch_size': batch_size,
+                'rows_per_sec': None,
+                'error': f"case process exited with code {process.exitcode} without a result",
+            }
+            results.append(result)
+            print(f"{function:>24} {variant:>10} {str(batch_size):>7} | FAILED: {result['error']}")
+            continue
+        results.append(result)
+        print(
+            f"{result['function']:>24} {result['variant']:>10} {str(result['batch_size']):>7} | "
+            f"{result['rows_per_sec'] or 0:>12.0f} rows/s | first row {result['time_to_first_row'] or 0:.4f}s | "
+            f"{result['peak_rss_kib'] / 1024:>7.1f} MiB | {result['round_trips']:>7} round trips"
+        )
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'backend': backend.name,
+            'rows': rows,
+            'data_seed': DATA_SEED,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """
+    Prints the rows/sec ratio of every case present in both result files
+    """
+    def key(result: Dict[str, Any]) -> Tuple[Any, ...]:
+        return result['function'], result['variant'], result['batch_size']
+
+    before = {key(result): result for result in previous['results']}
+    print(f"\nrows/sec vs {previous['meta'].get('commit')} ({previous['meta'].get('rows')} rows)")
+    for result in current['results']:
+        old = before.get(key(result))
+        if not old or not old['rows_per_sec'] or not result['rows_per_sec']:
+            continue
+        ratio = result['rows_per_sec'] / old['rows_per_sec']
+        print(f"{result['function']:>24} {result['variant']:>10} {str(result['batch_size']):>7} | x{ratio:.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000, help="user_data size (10k to 10M)")
+    parser.add_argument('--batch-sizes', default='100,1000,10000', help="comma separated batch/page sizes")
+    parser.add_argument('--backend', choices=tuple(BACKENDS), help="overrides DB_BACKEND")
+    parser.add_argument('--output', help="write JSON results to this file")
+    parser.add_argument('--compare', help="JSON results of a previous run to compare against")
+    args = parser.parse_args()
+
+    if args.backend:
+        seed.set_backend(BACKENDS[args.backend]())
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+
+    report = run_benchmarks(args.rows, batch_sizes)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+            output.write('\n')
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as previous:
+            compare(json.load(previous), report)
+
+
+if __name__ == "__main__":
+    main()
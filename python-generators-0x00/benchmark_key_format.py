@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark comparing the user_id storage formats (backends.KEY_FORMATS).
+
+For each format a separate table is built from the same synthetic rows
+(a `<SQLITE_PATH>.<format>` file for SQLite, an `ALX_prodev_<format>`
+database for MySQL), so the existing user_data table is never touched.
+It reports the on-disk table size (data + indexes), the insert rate and the
+full-scan rate of stream_users_in_batches.
+
+Usage:
+    python3 benchmark_key_format.py [rows] [batch_size]
+"""
+import contextlib
+import io
+import sys
+import time
+from typing import Any, Dict
+
+import seed
+from backends import KEY_FORMATS
+from benchmark import scratch_backend, synthetic_users
+from seed import DatabaseManager, chunked, get_pool
+
+
+def table_size(connection: Any, backend: Any) -> int:
+    """
+    Bytes used by user_data and its indexes
+    """
+    cursor = connection.cursor()
+    try:
+        if backend.name == 'sqlite':
+            cursor.execute("VACUUM")
+            cursor.execute("PRAGMA page_count")
+            pages = cursor.fetchone()[0]
+            cursor.execute("PRAGMA page_size")
+            return pages * cursor.fetchone()[0]
+        cursor.execute("ANALYZE TABLE user_data")
+        cursor.fetchall()
+        cursor.execute("""
+            SELECT data_length + index_length FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_name = 'user_data'
+        """)
+        return int(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+
+
+def run_format(base: Any, key_format: str, rows: int, batch_size: int) -> Dict[str, Any]:
+    """
+    Rebuilds the table for one format and measures it
+    """
+    backend = scratch_backend(base, key_format, key_format)
+    seed.set_backend(backend)
+    db_manager = DatabaseManager(backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        server = db_manager.connect_db()
+        db_manager.create_database(server)
+        server.close()
+
+        with get_pool().connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("DROP TABLE IF EXISTS user_data")
+            cursor.close()
+            db_manager.create_table(connection)
+
+            start = time.perf_counter()
+            for chunk in chunked(synthetic_users(rows), batch_size):
+                db_manager.insert_batch(connection, chunk)
+                connection.commit()
+            insert_seconds = time.perf_counter() - start
+            size = table_size(connection, backend)
+
+    stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+    scanned = 0
+    start = time.perf_counter()
+    for batch in stream_users_in_batches(batch_size, row_format='tuple'):
+        scanned += len(batch)
+    scan_seconds = time.perf_counter() - start
+    get_pool().close_all()
+
+    return {
+        'format': key_format,
+        'size': size,
+        'insert_rate': rows / insert_seconds if insert_seconds else 0.0,
+        'scan_rate': scanned / scan_seconds if scan_seconds else 0.0,
+    }
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    base = seed.get_backend()
+    print(f"{rows} rows on {base.name}, batch size {batch_size}")
+    print(f"{'format':>8} | {'table size (MiB)':>16} | {'inserts/sec':>12} | {'scanned rows/sec':>16}")
+    print("-" * 64)
+    for key_format in KEY_FORMATS:
+        result = run_format(base, key_format, rows, batch_size)
+        print(
+            f"{result['format']:>8} | {result['size'] / (1024 * 1024):>16.2f} | "
+            f"{result['insert_rate']:>12.0f} | {result['scan_rate']:>16.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Validates the bounded-memory guarantee of stream_users with tracemalloc.
+
+Streams the whole user_data table of the scratch benchmark database
+(seeded up to total_rows if needed, see benchmark_pagination.ensure_rows) and
+records the traced peak after every checkpoint. The peak must stay below
+the documented ceiling of fetch_size * seed.STREAM_ROW_BYTES +
+seed.STREAM_BASELINE_BYTES and must not grow between the first and the last
+checkpoint. test_stream_memory.py checks the same bound on a small table.
+
+Usage:
+    python3 benchmark_memory.py [total_rows] [fetch_size]
+
+Exits with status 1 if the ceiling is exceeded or memory grows with the table.
+"""
+import sys
+import tracemalloc
+
+from benchmark_pagination import ensure_rows
+from seed import STREAM_BASELINE_BYTES as BASELINE_BYTES, STREAM_ROW_BYTES as ROW_BYTES
+
+stream_users = __import__('0-stream_users').stream_users
+
+
+def main() -> int:
+    total_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    fetch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    total_rows = ensure_rows(total_rows)
+    ceiling = fetch_size * ROW_BYTES + BASELINE_BYTES
+    checkpoints = {total_rows * step // 10 for step in range(1, 11)}
+    peaks = []
+
+    tracemalloc.start()
+    try:
+        for count, _ in enumerate(stream_users(fetch_size), start=1):
+            if count in checkpoints:
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append((count, peak))
+    finally:
+        tracemalloc.stop()
+
+    print(f"{total_rows} rows, fetch size {fetch_size}, ceiling {ceiling / 1024:.0f} KiB")
+    print(f"{'rows streamed':>14} | {'peak (KiB)':>10}")
+    print("-" * 28)
+    for count, peak in peaks:
+        print(f"{count:>14} | {peak / 1024:>10.0f}")
+
+    final_peak = peaks[-1][1] if peaks else 0
+    first_peak = peaks[0][1] if peaks else 0
+    if final_peak > ceiling:
+        print(f"FAIL: peak {final_peak / 1024:.0f} KiB exceeds ceiling {ceiling / 1024:.0f} KiB")
+        return 1
+    # Allow one extra fetch block of slack for allocator noise between checkpoints
+    if final_peak > first_peak + fetch_size * ROW_BYTES:
+        print("FAIL: peak memory grew with the number of rows streamed")
+        return 1
+    print("OK: peak memory is bounded by the fetch size")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
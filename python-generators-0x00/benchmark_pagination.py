@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark comparing per-page latency of OFFSET and keyset pagination.
+
+Seeds the scratch benchmark database (benchmark.use_scratch_backend; the
+real user_data is never touched) up to the requested row count and then times
+single page fetches at increasing depths for both paginate_users (offset)
+and paginate_users_after (keyset).
+
+Usage:
+    python3 benchmark_pagination.py [total_rows] [page_size]
+"""
+import sys
+import time
+import uuid
+from typing import Dict, List
+
+from benchmark import use_scratch_backend
+from seed import DatabaseManager, chunked, get_pool
+
+lazy_paginate_module = __import__('2-lazy_paginate')
+paginate_users = lazy_paginate_module.paginate_users
+paginate_users_after = lazy_paginate_module.paginate_users_after
+
+
+def ensure_rows(total_rows: int, batch_size: int = 5000) -> int:
+    """
+    Switches to the scratch benchmark database and tops its user_data up
+    with synthetic rows until it holds at least total_rows
+    """
+    db_manager = DatabaseManager(use_scratch_backend())
+    with get_pool().connection() as connection:
+        db_manager.create_table(connection)
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        existing = cursor.fetchone()[0]
+        cursor.close()
+
+        missing = max(0, total_rows - existing)
+        if missing:
+            print(f"Seeding {missing} synthetic rows...")
+            rows = (
+                (str(uuid.uuid4()), f"User {i}", f"user{i}@example.com", 18 + i % 60)
+                for i in range(missing)
+            )
+            for chunk in chunked(rows, batch_size):
+                db_manager.insert_batch(connection, chunk)
+                connection.commit()
+        return existing + missing
+
+
+def boundary_keys(depths: List[int]) -> Dict[int, str]:
+    """
+    Finds the user_id just before each depth so keyset pages start at the same row
+    """
+    keys = {}
+    with get_pool().connection() as connection:
+        cursor = connection.cursor()
+        for depth in depths:
+            if depth == 0:
+                continue
+            cursor.execute(
+                "SELECT user_id FROM user_data ORDER BY user_id LIMIT 1 OFFSET %s", (depth - 1,)
+            )
+            keys[depth] = cursor.fetchone()[0]
+        cursor.close()
+    return keys
+
+
+def time_call(func, *args, repeat: int = 3) -> float:
+    """
+    Returns the best wall-clock time in milliseconds over `repeat` runs
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    total_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    total_rows = ensure_rows(total_rows)
+    depths = [0] + [total_rows * step // 10 for step in range(1, 10)] + [total_rows - page_size]
+    keys = boundary_keys(depths)
+
+    print(f"\n{total_rows} rows, page size {page_size}")
+    print(f"{'depth':>10} | {'offset (ms)':>12} | {'keyset (ms)':>12}")
+    print("-" * 40)
+    for depth in depths:
+        offset_ms = time_call(paginate_users, page_size, depth)
+        keyset_ms = time_call(paginate_users_after, page_size, keys.get(depth))
+        print(f"{depth:>10} | {offset_ms:>12.2f} | {keyset_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
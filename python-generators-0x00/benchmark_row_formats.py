@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark comparing the row formats of stream_users_in_batches.
+
+The deterministic synthetic table of benchmark.prepare_dataset is built in
+the scratch benchmark database (the real user_data is never read or
+modified). Each format is streamed over the whole table in a fresh process,
+so the reported peak RSS belongs to that format alone.
+
+Usage:
+    python3 benchmark_row_formats.py [batch_size] [rows]
+"""
+import multiprocessing
+import resource
+import sys
+import time
+from typing import Any
+
+import seed
+from benchmark import prepare_dataset
+from seed import ROW_FORMATS, get_pool
+
+
+def run_format(backend: Any, row_format: str, batch_size: int, results: multiprocessing.Queue) -> None:
+    """
+    Streams the table in the given format and reports rows, seconds and peak RSS
+    """
+    seed.set_backend(backend)
+    stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+
+    rows = 0
+    start = time.perf_counter()
+    for batch in stream_users_in_batches(batch_size, row_format=row_format):
+        # Touch one field per row so every format pays for attribute access
+        if row_format == 'columns':
+            rows += len(batch['age'])
+            sum(batch['age'])
+        elif row_format == 'dict':
+            rows += len(batch)
+            sum(row['age'] for row in batch)
+        elif row_format == 'record':
+            rows += len(batch)
+            sum(row.age for row in batch)
+        else:
+            rows += len(batch)
+            sum(row[3] for row in batch)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak_rss //= 1024
+    results.put((row_format, rows, elapsed, peak_rss))
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    total_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+
+    prepare_dataset(total_rows)
+    backend = seed.get_backend()
+    get_pool().close_all()
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    print(f"batch size {batch_size}")
+    print(f"{'format':>8} | {'rows':>10} | {'rows/sec':>12} | {'peak RSS (MiB)':>14}")
+    print("-" * 54)
+    for row_format in ROW_FORMATS:
+        process = context.Process(target=run_format, args=(backend, row_format, batch_size, results))
+        process.start()
+        name, rows, elapsed, peak_rss = results.get()
+        process.join()
+        rate = rows / elapsed if elapsed else 0.0
+        print(f"{name:>8} | {rows:>10} | {rate:>12.0f} | {peak_rss / 1024:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Generator, Optional
+
+
+class FileCheckpoint:
+    """
+    Stores the last committed key of a batch job in a small local file.
+    Writes go to a temporary file that is fsynced and atomically renamed,
+    so a crash leaves either the previous or the new key, never a torn one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[str]:
+        """
+        Returns the saved key, or None if the job has not committed a batch yet
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as checkpoint_file:
+                key = checkpoint_file.read().strip()
+        except FileNotFoundError:
+            return None
+        return key or None
+
+    def save(self, key: str) -> None:
+        """
+        Records `key` as the last committed key
+        """
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as checkpoint_file:
+            checkpoint_file.write(key)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temp_path, self.path)
+
+    def clear(self) -> None:
+        """
+        Forgets the saved key so the next run starts from the beginning
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class SQLiteCheckpoint:
+    """
+    Stores the last committed key of several named jobs in one SQLite file
+    """
+
+    def __init__(self, path: str, job: str):
+        self.path = path
+        self.job = job
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    job TEXT PRIMARY KEY,
+                    last_key TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self) -> Generator[sqlite3.Connection, None, None]:
+        # sqlite3's own context manager commits but does not close
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def load(self) -> Optional[str]:
+        """
+        Returns the saved key for this job, or None
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT last_key FROM checkpoints WHERE job = ?", (self.job,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, key: str) -> None:
+        """
+        Records `key` as the last committed key for this job
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO checkpoints (job, last_key, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(job) DO UPDATE SET last_key = excluded.last_key, updated_at = excluded.updated_at",
+                (self.job, key, time.time())
+            )
+
+    def clear(self) -> None:
+        """
+        Forgets this job's key so the next run starts from the beginning
+        """
+        with self._connect() as connection:
+            connection.execute("DELETE FROM checkpoints WHERE job = ?", (self.job,))
@@ -0,0 +1,219 @@
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, BinaryIO, Dict, Generator, Iterable, List, Optional, Sequence
+
+from seed import USER_COLUMNS, QuerySpec
+
+try:
+    import zstandard
+except ImportError:  # zstd output is optional
+    zstandard = None
+
+stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+
+# Output formats:
+#   'ndjson'   - one JSON object per user per line
+#   'csv'      - header row followed by one row per user
+#   'columnar' - one JSON line per batch holding per-column value lists,
+#                which groups similar values together and compresses better
+EXPORT_FORMATS = ('ndjson', 'csv', 'columnar')
+COMPRESSIONS = (None, 'gzip', 'zstd')
+
+# Size of the write buffer between the serializer and the compressor/file
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def _json_default(value: Any) -> Any:
+    """
+    Serializes the DECIMAL and TIMESTAMP values returned by MySQL
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _open_output(path: str, compression: Optional[str], level: Optional[int]) -> BinaryIO:
+    """
+    Opens a buffered binary stream that compresses into `path`
+    """
+    if compression is None:
+        return io.BufferedWriter(open(path, 'wb', buffering=0), WRITE_BUFFER_SIZE)
+    if compression == 'gzip':
+        # GzipFile opened by name owns (and closes) the underlying file
+        return io.BufferedWriter(
+            gzip.GzipFile(path, mode='wb', compresslevel=6 if level is None else level),
+            WRITE_BUFFER_SIZE
+        )
+    if zstandard is None:
+        raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+    raw = open(path, 'wb')
+    compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+    # closefd so closing the writer also closes the file
+    return io.BufferedWriter(compressor.stream_writer(raw, closefd=True), WRITE_BUFFER_SIZE)
+
+
+def export_users(path: str, fmt: str = 'ndjson', compression: Optional[str] = None,
+                 batch_size: int = 10000, spec: Optional[QuerySpec] = None,
+                 prefetch: int = 2, level: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Exports user_data to a file by streaming batches from
+    stream_users_in_batches. Each batch is serialized once and written
+    through a fixed-size buffer, so memory stays flat at about one batch
+    regardless of table size. The next batch is prefetched from the database
+    while the current one is being compressed.
+
+    The file is written to `path + '.part'` and renamed when complete, so a
+    failed export never leaves a truncated file under the final name.
+
+    Args:
+        path: Output file path
+        fmt: One of EXPORT_FORMATS
+        compression: None, 'gzip' or 'zstd' (needs the zstandard package)
+        batch_size: Rows fetched and serialized at a time
+        spec: Optional QuerySpec selecting rows/columns to export
+        prefetch: Batches fetched ahead on a background thread (0 disables)
+        level: Compression level (defaults: gzip 6, zstd 3)
+
+    Returns:
+        Dictionary with rows, bytes (on disk), seconds, rows_per_sec and mb_per_sec
+    """
+    _check_options(fmt, compression)
+    spec = spec or QuerySpec()
+    row_format = 'columns' if fmt == 'columnar' else 'tuple'
+    batches = stream_users_in_batches(batch_size, spec, row_format, prefetch=prefetch)
+    try:
+        return export_batches(path, batches, fmt, compression, level, spec.columns)
+    finally:
+        # Stops the prefetch thread and returns the connection on early failure
+        batches.close()
+
+
+def _check_options(fmt: str, compression: Optional[str]) -> None:
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {EXPORT_FORMATS}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}, expected one of {COMPRESSIONS}")
+
+
+def _as_tuples(batch: Any, columns: Sequence[str]) -> List[Any]:
+    """
+    Returns the rows of a batch as tuples in column order ('dict' and
+    'columns' batches are converted)
+    """
+    if isinstance(batch, dict):
+        return list(zip(*(batch[column] for column in columns)))
+    if batch and isinstance(batch[0], dict):
+        return [tuple(row[column] for column in columns) for row in batch]
+    return batch
+
+
+def _as_columns(batch: Any, columns: Sequence[str]) -> Dict[str, Any]:
+    """
+    Returns a batch as {column: values} ('dict' and 'tuple' batches are converted)
+    """
+    if isinstance(batch, dict):
+        return batch
+    rows = _as_tuples(batch, columns)
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return dict(zip(columns, values))
+
+
+def export_batches(path: str, batches: Iterable[Any], fmt: str = 'ndjson',
+                   compression: Optional[str] = None, level: Optional[int] = None,
+                   columns: Sequence[str] = USER_COLUMNS) -> Dict[str, Any]:
+    """
+    Writes already-fetched batches to a file; the writing half of export_users,
+    usable with any batch source (e.g. a shared_scan.SharedScan consumer).
+    Batches may be in any row format except 'record'; they are not modified.
+
+    Args:
+        path: Output file path (written as `path + '.part'`, then renamed)
+        batches: Iterable of 'tuple', 'dict' or 'columns' batches
+        fmt: One of EXPORT_FORMATS
+        compression: None, 'gzip' or 'zstd'
+        level: Compression level
+        columns: Column order of the rows (and of the csv header)
+
+    Returns:
+        Same statistics as export_users
+    """
+    _check_options(fmt, compression)
+    columns = list(columns)
+    rows = 0
+    start = time.perf_counter()
+    temp_path = f"{path}.part"
+    try:
+        with _open_output(temp_path, compression, level) as output:
+            text = io.TextIOWrapper(output, encoding='utf-8', newline='', write_through=True)
+            if fmt == 'csv':
+                writer = csv.writer(text)
+                writer.writerow(columns)
+                for batch in batches:
+                    batch = _as_tuples(batch, columns)
+                    writer.writerows(batch)
+                    rows += len(batch)
+            elif fmt == 'ndjson':
+                for batch in batches:
+                    batch = _as_tuples(batch, columns)
+                    text.write("".join(
+                        json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in batch
+                    ))
+                    rows += len(batch)
+            else:
+                for batch in batches:
+                    batch = _as_columns(batch, columns)
+                    count = len(batch[columns[0]])
+                    chunk = {'rows': count}
+                    chunk.update((column, list(values)) for column, values in batch.items())
+                    text.write(json.dumps(chunk, default=_json_default) + "\n")
+                    rows += count
+            text.flush()
+            text.detach()
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(path)
+    stats = {
+        'rows': rows,
+        'bytes': size,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        'mb_per_sec': size / elapsed / (1024 * 1024) if elapsed else 0.0,
+    }
+    print(
+        f"Exported {rows} rows to {path} ({size / (1024 * 1024):.1f} MiB) in {elapsed:.2f}s: "
+        f"{stats['rows_per_sec']:.0f} rows/sec, {stats['mb_per_sec']:.1f} MiB/sec"
+    )
+    return stats
+
+
+def read_columnar(path: str, compression: Optional[str] = None) -> Generator[Dict[str, Any], None, None]:
+    """
+    Reads back a 'columnar' export one chunk at a time
+
+    Yields:
+        Dictionaries of {'rows': n, column: [values], ...}
+    """
+    if compression == 'gzip':
+        raw = gzip.open(path, 'rb')
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    else:
+        raw = open(path, 'rb')
+    with io.TextIOWrapper(raw, encoding='utf-8') as lines:
+        for line in lines:
+            yield json.loads(line)
@@ -0,0 +1,159 @@
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+from seed import Error, QuerySpec, USER_COLUMNS, get_backend, get_pool, stream_formatted
+
+# (updated_at, user_id) of the last change already seen; None means "from the start"
+Watermark = Optional[Tuple[str, str]]
+
+CHANGE_COLUMNS = USER_COLUMNS + ('updated_at',)
+
+
+def stream_changes_since(watermark: Watermark = None, batch_size: int = 1000,
+                         row_format: str = 'dict') -> Generator[Tuple[List[Any], Tuple[str, str]], None, None]:
+    """
+    Streams the user_data rows inserted or updated after `watermark`, in
+    (updated_at, user_id) order, using idx_updated_at to seek straight to the
+    first change. A run costs O(changes) instead of O(table).
+
+    The user_id tie-breaker makes the watermark exact even when many rows share
+    a timestamp. Deleted rows are not reported; rows committed by a transaction
+    that started before the previous run may carry an older timestamp, so keep
+    long-running writers in mind when choosing how often to poll.
+
+    Args:
+        watermark: Value yielded by a previous run, or None for every row
+        batch_size: Number of rows per batch
+        row_format: 'dict' or 'tuple' (columns: user_id, name, email, age, updated_at)
+
+    Yields:
+        Tuples of (batch, watermark after this batch). Persist the watermark
+        once the batch is processed and pass it to the next run.
+    """
+    if row_format not in ('dict', 'tuple'):
+        raise ValueError("stream_changes_since supports the 'dict' and 'tuple' row formats")
+
+    spec = QuerySpec(CHANGE_COLUMNS, ordering=(('updated_at', False), ('user_id', False)))
+    conditions = []
+    if watermark is not None:
+        updated_at, user_id = watermark
+        conditions.append((
+            "(updated_at > %s OR (updated_at = %s AND user_id > %s))",
+            (updated_at, updated_at, get_backend().key_param(user_id))
+        ))
+    query, params = spec.to_sql(extra_conditions=conditions)
+
+    try:
+        with get_pool().connection() as connection:
+            for batch in stream_formatted(connection, query, params, CHANGE_COLUMNS, batch_size, row_format):
+                last = batch[-1]
+                if row_format == 'dict':
+                    new_watermark = (str(last['updated_at']), last['user_id'])
+                else:
+                    new_watermark = (str(last[4]), last[0])
+                yield batch, new_watermark
+    except Error as e:
+        print(f"Database error in stream_changes_since: {e}")
+        raise
+
+
+class IncrementalAverage:
+    """
+    Cached count/sum/average of user ages, refreshed from the change stream.
+
+    The state lives in a local SQLite file: the totals, the watermark and the
+    age each user currently contributes. For a changed row the old
+    contribution is looked up and replaced, so updates are applied correctly
+    without rescanning user_data. Deletes are not visible in the change
+    stream; call rebuild() after deleting users.
+    """
+
+    def __init__(self, state_path: str):
+        self.state_path = state_path
+        with self._connect() as state:
+            state.execute("""
+                CREATE TABLE IF NOT EXISTS contributions (
+                    user_id TEXT PRIMARY KEY,
+                    age INTEGER NOT NULL
+                )
+            """)
+            state.execute("""
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    count INTEGER NOT NULL,
+                    total INTEGER NOT NULL,
+                    watermark_at TEXT,
+                    watermark_id TEXT
+                )
+            """)
+            state.execute("INSERT OR IGNORE INTO totals (id, count, total) VALUES (1, 0, 0)")
+
+    @contextmanager
+    def _connect(self) -> Generator[sqlite3.Connection, None, None]:
+        # sqlite3's own context manager commits but does not close
+        state = sqlite3.connect(self.state_path)
+        try:
+            with state:
+                yield state
+        finally:
+            state.close()
+
+    def _totals(self, state: sqlite3.Connection) -> Tuple[int, int, Watermark]:
+        count, total, watermark_at, watermark_id = state.execute(
+            "SELECT count, total, watermark_at, watermark_id FROM totals WHERE id = 1"
+        ).fetchone()
+        watermark = (watermark_at, watermark_id) if watermark_at is not None else None
+        return count, total, watermark
+
+    def refresh(self, batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Applies every change since the stored watermark and returns the
+        updated result. Each batch is committed together with its watermark,
+        so an interrupted refresh resumes where it stopped.
+
+        Returns:
+            Dictionary with count, sum, avg and the number of changes applied
+        """
+        with self._connect() as state:
+            count, total, watermark = self._totals(state)
+
+        applied = 0
+        for batch, new_watermark in stream_changes_since(watermark, batch_size, row_format='tuple'):
+            with self._connect() as state:
+                for user_id, _, _, age, _ in batch:
+                    age = int(age)
+                    previous = state.execute(
+                        "SELECT age FROM contributions WHERE user_id = ?", (user_id,)
+                    ).fetchone()
+                    if previous is None:
+                        count += 1
+                        total += age
+                    else:
+                        total += age - previous[0]
+                    state.execute(
+                        "INSERT OR REPLACE INTO contributions (user_id, age) VALUES (?, ?)", (user_id, age)
+                    )
+                state.execute(
+                    "UPDATE totals SET count = ?, total = ?, watermark_at = ?, watermark_id = ? WHERE id = 1",
+                    (count, total, new_watermark[0], new_watermark[1])
+                )
+            applied += len(batch)
+
+        return {
+            'count': count,
+            'sum': total,
+            'avg': total / count if count else 0.0,
+            'changes_applied': applied,
+        }
+
+    def rebuild(self, batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Drops the cached state and recomputes it from a full scan
+        """
+        with self._connect() as state:
+            state.execute("DELETE FROM contributions")
+            state.execute(
+                "UPDATE totals SET count = 0, total = 0, watermark_at = NULL, watermark_id = NULL WHERE id = 1"
+            )
+        return self.refresh(batch_size)
@@ -0,0 +1,190 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Generator, List, Optional
+
+# Counters reported by seed.py and the generator modules
+CONNECTIONS_OPENED = 'connections_opened'
+ROWS_READ = 'rows_read'
+ROWS_WRITTEN = 'rows_written'
+ROWS_SKIPPED = 'rows_skipped'
+
+# Gauges (last / min / max of a sampled value)
+BATCH_SIZE = 'batch_size'
+
+# Query types with a latency histogram:
+#   'lookup'       - single-row SELECT by user_id (insert_data duplicate check)
+#   'insert'       - single-row INSERT (insert_data)
+#   'insert_batch' - one multi-row INSERT statement (insert_batch)
+#   'execute'      - executing a streamed query, up to its first row being available
+#   'fetch'        - one fetchmany() of a streamed query
+#   'page'         - one LIMIT/OFFSET or keyset page (2-lazy_paginate)
+#   'connect'      - opening a connection to ALX_prodev
+#   'pool_wait'    - waiting for a free pooled connection
+QUERY_TYPES = ('lookup', 'insert', 'insert_batch', 'execute', 'fetch', 'page', 'connect', 'pool_wait')
+
+# Upper bounds (seconds) of the histogram buckets: 10us doubling up to ~84s,
+# plus an overflow bucket
+BUCKET_BOUNDS = tuple(0.00001 * 2 ** index for index in range(24))
+
+
+class Instrumentation:
+    """
+    Receives counters and latencies from the database code. This base class
+    discards everything and is the default, so instrumented paths cost a
+    couple of method calls when nobody is collecting.
+    """
+
+    def count(self, name: str, value: int = 1) -> None:
+        """
+        Adds `value` to the counter `name`
+        """
+
+    def observe(self, query_type: str, seconds: float) -> None:
+        """
+        Records one latency sample for `query_type`
+        """
+
+    def gauge(self, name: str, value: float) -> None:
+        """
+        Records the current value of `name` (e.g. the adaptive batch size)
+        """
+
+    @contextmanager
+    def timed(self, query_type: str) -> Generator[None, None, None]:
+        """
+        Context manager observing the duration of its block
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(query_type, time.perf_counter() - start)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram: constant memory per query type,
+    percentiles accurate to the bucket width (a factor of two)
+    """
+
+    def __init__(self):
+        self.buckets: List[int] = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, seconds: float) -> None:
+        index = 0
+        while index < len(BUCKET_BOUNDS) and seconds > BUCKET_BOUNDS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Returns the upper bound of the bucket holding the given fraction
+        (0.5 for the median), capped at the largest observed value
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank and bucket:
+                bound = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+        }
+
+
+class MemoryCollector(Instrumentation):
+    """
+    Keeps counters and latency histograms in memory, for benchmarks and
+    tests to read back. Safe to share between threads; worker processes
+    (parallel_scan) collect into their own copy.
+
+    Example:
+        collector = MemoryCollector()
+        set_instrumentation(collector)
+        list(stream_users())
+        assert collector.counters['rows_read'] == total_rows
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.gauges: Dict[str, Dict[str, float]] = {}
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, query_type: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(query_type)
+            if histogram is None:
+                histogram = self.histograms[query_type] = LatencyHistogram()
+            histogram.add(seconds)
+
+    def gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            gauge = self.gauges.get(name)
+            if gauge is None:
+                self.gauges[name] = {'last': value, 'min': value, 'max': value, 'samples': 1}
+            else:
+                gauge['last'] = value
+                gauge['min'] = min(gauge['min'], value)
+                gauge['max'] = max(gauge['max'], value)
+                gauge['samples'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns a JSON-serializable copy of every counter, histogram summary and gauge
+        """
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'latency': {name: histogram.summary() for name, histogram in self.histograms.items()},
+                'gauges': {name: dict(gauge) for name, gauge in self.gauges.items()},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.gauges.clear()
+
+
+_instrumentation: Instrumentation = Instrumentation()
+
+
+def get_instrumentation() -> Instrumentation:
+    """
+    Returns the process-wide instrumentation (a no-op unless set_instrumentation was called)
+    """
+    return _instrumentation
+
+
+def set_instrumentation(instrumentation: Optional[Instrumentation]) -> None:
+    """
+    Routes every counter and latency to `instrumentation`; None restores the no-op default
+    """
+    global _instrumentation
+    _instrumentation = instrumentation or Instrumentation()
@@ -0,0 +1,124 @@
+import csv
+import io
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
+
+# Bytes of CSV parsed by one task; large enough to amortize pickling the
+# results back, small enough that a few in flight per worker stay cheap
+CHUNK_BYTES = 4 * 1024 * 1024
+
+# Parsed chunks allowed in flight per worker before the reader waits for the writer
+QUEUE_DEPTH = 2
+
+Row = Tuple[str, str, str, int]
+Normalizer = Callable[[Dict[str, str]], Row]
+
+
+def byte_ranges(path: str, chunk_bytes: int = CHUNK_BYTES) -> Generator[Tuple[int, int], None, None]:
+    """
+    Splits the data lines of a CSV file (everything after the header line)
+    into (start, end) byte ranges of about chunk_bytes. Every range starts at
+    the beginning of a line and ends just after a newline (or at EOF).
+
+    Quoted fields must not contain newlines; user_data exports never do.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as csv_file:
+        csv_file.readline()
+        start = csv_file.tell()
+        while start < size:
+            csv_file.seek(min(start + chunk_bytes, size))
+            if csv_file.tell() < size:
+                # Move the cut to the end of the line it falls in
+                csv_file.readline()
+            end = csv_file.tell()
+            yield start, end
+            start = end
+
+
+def _parse_range(path: str, start: int, end: int, header: List[str],
+                 normalize: Normalizer) -> Tuple[List[Row], List[Tuple[int, str]], int]:
+    """
+    Worker entry point: parses one byte range.
+
+    Returns:
+        (rows as compact tuples, [(line within the range, error)], lines in the range)
+    """
+    with open(path, 'rb') as csv_file:
+        csv_file.seek(start)
+        text = csv_file.read(end - start).decode('utf-8')
+
+    rows = []
+    rejected = []
+    reader = csv.reader(io.StringIO(text, newline=''))
+    for fields in reader:
+        if not fields:
+            # csv.DictReader skips blank lines too
+            continue
+        try:
+            # Pad short rows with None like csv.DictReader does
+            rows.append(normalize(dict(zip(header, fields + [None] * (len(header) - len(fields))))))
+        except (KeyError, ValueError, TypeError) as e:
+            rejected.append((reader.line_num, str(e)))
+    lines = text.count('\n') + (1 if text and not text.endswith('\n') else 0)
+    return rows, rejected, lines
+
+
+def parallel_csv_rows(path: str, normalize: Normalizer, workers: Optional[int] = None,
+                      chunk_bytes: int = CHUNK_BYTES,
+                      stats: Optional[Dict[str, Any]] = None) -> Generator[Row, None, None]:
+    """
+    Parses a CSV file on a pool of worker processes and yields its rows in
+    file order. The file is cut at newline-aligned byte offsets, each range is
+    parsed and normalized by a worker, and at most workers * QUEUE_DEPTH parsed
+    ranges wait for the consumer, so memory stays bounded when the database
+    writer is the slower side.
+
+    Rejected lines are printed with their line number in the whole file,
+    exactly as the single-process reader reports them.
+
+    Args:
+        path: CSV file with a header line
+        normalize: Top-level (picklable) function turning a {column: value}
+                   dict into a row tuple, e.g. DatabaseManager.normalize_row
+        workers: Number of parser processes (defaults to os.cpu_count())
+        chunk_bytes: Approximate size of each parsed range
+        stats: Optional dict whose 'rows_read' and 'rejected' counters are updated
+
+    Yields:
+        Normalized row tuples
+    """
+    workers = workers or os.cpu_count() or 1
+    with open(path, 'r', newline='', encoding='utf-8') as csv_file:
+        header = next(csv.reader([csv_file.readline()]), [])
+
+    pending: 'deque[Future]' = deque()
+    # Line 1 is the header
+    lines_before = 1
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        ranges = byte_ranges(path, chunk_bytes)
+        for start, end in ranges:
+            pending.append(executor.submit(_parse_range, path, start, end, header, normalize))
+            if len(pending) >= workers * QUEUE_DEPTH:
+                break
+
+        while pending:
+            rows, rejected, lines = pending.popleft().result()
+            # Keep the pipeline full before handing rows to the (slow) writer
+            for start, end in ranges:
+                pending.append(executor.submit(_parse_range, path, start, end, header, normalize))
+                break
+
+            for line, error in rejected:
+                print(f"Rejected line {lines_before + line}: {error}")
+            if stats is not None:
+                stats['rows_read'] = stats.get('rows_read', 0) + len(rows) + len(rejected)
+                stats['rejected'] = stats.get('rejected', 0) + len(rejected)
+            lines_before += lines
+            yield from rows
+    finally:
+        # Stops parsing ahead if the consumer stopped early or failed
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,255 @@
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import traceback
+import uuid
+from typing import Any, Callable, Generator, List, Optional, Tuple
+
+import seed
+from backends import decode_key
+from seed import Error, QuerySpec, chunked, get_pool, key_getter, stream_formatted
+
+# Partitioning strategies:
+#   'range' - contiguous user_id ranges splitting the key space between the
+#             smallest and largest user_id into equal slices
+#   'hash'  - MOD(CRC32(user_id), N) buckets; no setup query, but every worker's
+#             query walks the whole table on the server
+PARTITION_MODES = ('range', 'hash')
+
+# Batches each worker may queue ahead of the consumer before it blocks
+QUEUE_DEPTH = 4
+
+# How often a waiting consumer checks that the workers are still alive
+WORKER_POLL_SECONDS = 1.0
+
+_DONE = '__done__'
+_ERROR = '__error__'
+
+Condition = Tuple[str, Tuple[Any, ...]]
+
+
+def _uuid_value(key: Any) -> Optional[int]:
+    try:
+        return uuid.UUID(key).int
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _scanned_boundaries(cursor: Any, connection: Any, partitions: int) -> List[Any]:
+    """
+    Fallback for keys that are not UUIDs: one ordered pass over the primary
+    key, keeping every (total / partitions)-th key
+    """
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    total = cursor.fetchone()[0]
+    targets = [total * index // partitions for index in range(1, partitions)]
+    boundaries = []
+    position = 0
+    for rows in seed.stream_query(connection, "SELECT user_id FROM user_data ORDER BY user_id", fetch_size=10000):
+        for (user_id,) in rows:
+            if targets and position == targets[0]:
+                targets.pop(0)
+                boundaries.append(user_id)
+            position += 1
+        if not targets:
+            break
+    return boundaries
+
+
+def range_partitions(partitions: int) -> List[Condition]:
+    """
+    Splits user_data into contiguous user_id ranges of roughly equal row counts.
+
+    The smallest and largest keys are read from the primary key index, and
+    the 128-bit UUID space between them is cut into equal slices. That costs
+    two index lookups whatever the table size; slices hold equal row counts
+    when keys are random (uuid4). Keys that are not UUIDs are split with one
+    ordered pass over the primary key instead. Every row falls in exactly one
+    range either way; only the balance depends on the key distribution.
+
+    Args:
+        partitions: Number of ranges wanted
+
+    Returns:
+        One (sql, params) condition per range (fewer on small tables)
+    """
+    try:
+        with get_pool().connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT MIN(user_id), MAX(user_id) FROM user_data")
+                # Aggregates are not named user_id, so binary keys come back raw
+                low_key, high_key = (decode_key(key) for key in cursor.fetchone())
+                low, high = _uuid_value(low_key), _uuid_value(high_key)
+                boundaries = []
+                if low is not None and high is not None:
+                    for index in range(1, partitions):
+                        boundary = str(uuid.UUID(int=low + (high - low) * index // partitions))
+                        if boundary > str(uuid.UUID(int=low)) and (not boundaries or boundary > boundaries[-1]):
+                            boundaries.append(boundary)
+                elif low_key is not None:
+                    boundaries = _scanned_boundaries(cursor, connection, partitions)
+            finally:
+                seed.close_cursor(cursor)
+    except Error as e:
+        print(f"Database error in range_partitions: {e}")
+        raise
+
+    if not boundaries:
+        return [("1 = 1", ())]
+    boundaries = [seed.get_backend().key_param(boundary) for boundary in boundaries]
+    conditions = [("user_id < %s", (boundaries[0],))]
+    for low, high in zip(boundaries, boundaries[1:]):
+        conditions.append(("user_id >= %s AND user_id < %s", (low, high)))
+    conditions.append(("user_id >= %s", (boundaries[-1],)))
+    return conditions
+
+
+def hash_partitions(partitions: int) -> List[Condition]:
+    """
+    Splits user_data into hash buckets on user_id.
+
+    Returns:
+        One (sql, params) condition per bucket
+    """
+    return [("MOD(CRC32(user_id), %s) = %s", (partitions, index)) for index in range(partitions)]
+
+
+def _scan_worker(index: int, condition: Condition, spec: QuerySpec, batch_size: int,
+                 row_format: str, process_batch: Optional[Callable[[Any], Any]],
+                 out_queue: multiprocessing.Queue, backend: Any) -> None:
+    """
+    Streams one partition on its own connection and puts (index, batch)
+    items on out_queue, followed by (index, _DONE) or (index, _ERROR)
+    """
+    # Connections inherited from the parent through fork must not be reused,
+    # and spawned workers would not otherwise know the parent's backend
+    seed.reset_pool()
+    seed.set_backend(backend)
+    try:
+        query, params = spec.to_sql(extra_conditions=[condition])
+        with get_pool().connection() as connection:
+            for batch in stream_formatted(connection, query, params, spec.columns, batch_size, row_format):
+                if process_batch is not None:
+                    batch = process_batch(batch)
+                out_queue.put((index, batch))
+        out_queue.put((index, _DONE))
+    except Exception:
+        out_queue.put((index, (_ERROR, traceback.format_exc())))
+    finally:
+        seed.get_pool().close_all()
+
+
+def parallel_scan(partitions: Optional[int] = None, mode: str = 'range',
+                  spec: Optional[QuerySpec] = None, batch_size: int = 1000,
+                  row_format: str = 'dict', ordered: bool = False,
+                  process_batch: Optional[Callable[[Any], Any]] = None) -> Generator[Any, None, None]:
+    """
+    Scans user_data with one worker process per partition, each streaming its
+    partition on its own connection, so row decoding and per-batch processing
+    use all cores.
+
+    Args:
+        partitions: Number of worker processes (defaults to os.cpu_count())
+        mode: 'range' or 'hash' (see PARTITION_MODES)
+        spec: Optional QuerySpec applied inside every partition
+        batch_size: Rows per batch fetched by each worker
+        row_format: Row format of the batches (see seed.ROW_FORMATS)
+        ordered: Merge partitions into user_id order instead of yielding
+                 batches as soon as any worker produces them
+        process_batch: Top-level (picklable) function run on every batch inside
+                       the worker, e.g. a filter; its return value is yielded
+
+    Yields:
+        Batches from all partitions. With ordered=True the rows are merged by
+        user_id and re-chunked into batches of batch_size.
+    """
+    partitions = partitions or os.cpu_count() or 1
+    if mode not in PARTITION_MODES:
+        raise ValueError(f"Unknown partition mode {mode!r}, expected one of {PARTITION_MODES}")
+    spec = spec or QuerySpec()
+    if ordered:
+        if row_format == 'columns':
+            raise ValueError("Ordered merge needs row-based batches, not 'columns'")
+        if 'user_id' not in spec.columns:
+            spec = spec.select(*spec.columns, 'user_id')
+        spec = QuerySpec(spec.columns, spec.filters, (('user_id', False),))
+
+    conditions = range_partitions(partitions) if mode == 'range' else hash_partitions(partitions)
+
+    context = multiprocessing.get_context()
+    if ordered:
+        queues = [context.Queue(QUEUE_DEPTH) for _ in conditions]
+    else:
+        shared = context.Queue(QUEUE_DEPTH * len(conditions))
+        queues = [shared] * len(conditions)
+
+    workers = [
+        context.Process(
+            target=_scan_worker,
+            args=(index, condition, spec, batch_size, row_format, process_batch, queues[index],
+                  seed.get_backend()),
+            daemon=True,
+        )
+        for index, condition in enumerate(conditions)
+    ]
+    for worker in workers:
+        worker.start()
+
+    def check(item: Any) -> Any:
+        if isinstance(item, tuple) and len(item) == 2 and item[0] == _ERROR:
+            raise RuntimeError(f"Partition scan failed:\n{item[1]}")
+        return item
+
+    finished = set()
+
+    def receive(source: multiprocessing.Queue) -> Tuple[int, Any]:
+        # A worker killed from outside (e.g. by the OOM killer) never posts
+        # _DONE or _ERROR, so poll instead of blocking forever. Workers that
+        # exit normally always report first, so only failures are raised.
+        while True:
+            try:
+                return source.get(timeout=WORKER_POLL_SECONDS)
+            except queue.Empty:
+                for index, worker in enumerate(workers):
+                    if index not in finished and not worker.is_alive() and worker.exitcode != 0:
+                        raise RuntimeError(
+                            f"Partition scan worker {index} died with exit code {worker.exitcode}"
+                        )
+
+    def partition_rows(index: int) -> Generator[Any, None, None]:
+        while True:
+            _, batch = receive(queues[index])
+            if isinstance(batch, str) and batch == _DONE:
+                finished.add(index)
+                return
+            yield from check(batch)
+
+    try:
+        if not ordered:
+            while len(finished) < len(workers):
+                index, batch = receive(shared)
+                if isinstance(batch, str) and batch == _DONE:
+                    finished.add(index)
+                    continue
+                yield check(batch)
+        else:
+            streams = [partition_rows(index) for index in range(len(workers))]
+            if mode == 'range':
+                # Ranges are contiguous, so concatenating them is already ordered
+                rows = itertools.chain.from_iterable(streams)
+            else:
+                rows = heapq.merge(*streams, key=key_getter(row_format, spec.columns))
+            yield from chunked(rows, batch_size)
+    finally:
+        # Stop workers that are still producing if the consumer stopped early
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        for worker in workers:
+            worker.join()
+        for worker_queue in {id(q): q for q in queues}.values():
+            worker_queue.cancel_join_thread()
+            worker_queue.close()
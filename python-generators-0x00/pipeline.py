@@ -0,0 +1,308 @@
+import abc
+import collections
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Generator, Iterable, Iterator, List, Optional, Union
+
+from seed import QuerySpec, chunked, prefetched
+
+stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+
+# Items a ParallelMap keeps in flight per worker before waiting for results
+PARALLEL_DEPTH = 2
+
+
+class StageStats:
+    """
+    Throughput counters of one pipeline stage
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def result(self) -> Dict[str, Any]:
+        elapsed = (self.finished or time.perf_counter()) - self.started if self.started else 0.0
+        return {
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'seconds': elapsed,
+            # Counts the finer-grained side, so a Sink or Batch reports the
+            # items it consumed and a Flatten the items it produced
+            'items_per_sec': max(self.items_in, self.items_out) / elapsed if elapsed else 0.0,
+        }
+
+
+class Stage(abc.ABC):
+    """
+    One step of a Pipeline: turns an iterator of items into another one.
+    Subclasses implement process(); stages are reusable across runs.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name or type(self).__name__.lower()
+
+    @abc.abstractmethod
+    def process(self, items: Iterator[Any]) -> Iterator[Any]:
+        """
+        Returns the iterator of items this stage produces from `items`
+        """
+
+
+class Filter(Stage):
+    """
+    Keeps the items for which predicate(item) is true
+    """
+
+    def __init__(self, predicate: Callable[[Any], bool], name: Optional[str] = None):
+        super().__init__(name)
+        self.predicate = predicate
+
+    def process(self, items: Iterator[Any]) -> Iterator[Any]:
+        predicate = self.predicate
+        return (item for item in items if predicate(item))
+
+
+class Map(Stage):
+    """
+    Replaces every item with function(item)
+    """
+
+    def __init__(self, function: Callable[[Any], Any], name: Optional[str] = None):
+        super().__init__(name)
+        self.function = function
+
+    def process(self, items: Iterator[Any]) -> Iterator[Any]:
+        return map(self.function, items)
+
+
+class Flatten(Stage):
+    """
+    Yields the elements of every item (e.g. the users of each batch)
+    """
+
+    def process(self, items: Iterator[Any]) -> Iterator[Any]:
+        for item in items:
+            yield from item
+
+
+class Batch(Stage):
+    """
+    Groups items into lists of `size` (the last one may be shorter)
+    """
+
+    def __init__(self, size: int, name: Optional[str] = None):
+        super().__init__(name)
+        self.size = size
+
+    def process(self, items: Iterator[Any]) -> Iterator[Any]:
+        return chunked(items, self.size)
+
+
+class Window(Stage):
+    """
+    Count-based windows: every `step` items, yields a list of the last `size`
+    items. step=size (the default) gives tumbling windows, a smaller step
+    sliding ones. Only full windows are yielded.
+    """
+
+    def __init__(self, size: int, step: Optional[int] = None, name: Optional[str] = None):
+        super().__init__(name)
+        if size < 1 or (step is not None and step < 1):
+            raise ValueError("Window size and step must be at least 1")
+        self.size = size
+        self.step = step or size
+
+    def process(self, items: Iterator[Any]) -> Iterator[Any]:
+        window: collections.deque = collections.deque(maxlen=self.size)
+        since_last = 0
+        for item in items:
+            window.append(item)
+            since_last += 1
+            if len(window) == self.size and since_last >= self.step:
+                since_last = 0
+                yield list(window)
+
+
+class ParallelMap(Stage):
+    """
+    Map stage running `function` on a thread or process pool. At most
+    workers * PARALLEL_DEPTH items are in flight, so a slow consumer holds
+    back the upstream stages instead of growing a queue.
+
+    Threads suit I/O-bound functions; processes suit CPU-bound enrichment but
+    need a picklable top-level function, and per-item overhead is high enough
+    that mapping over Batch(...) lists is usually faster than single users.
+    """
+
+    def __init__(self, function: Callable[[Any], Any], workers: int = 4, kind: str = 'thread',
+                 ordered: bool = True, name: Optional[str] = None):
+        super().__init__(name)
+        if kind not in ('thread', 'process'):
+            raise ValueError("kind must be 'thread' or 'process'")
+        self.function = function
+        self.workers = workers
+        self.kind = kind
+        self.ordered = ordered
+
+    def process(self, items: Iterator[Any]) -> Iterator[Any]:
+        executor_class = ThreadPoolExecutor if self.kind == 'thread' else ProcessPoolExecutor
+        executor = executor_class(max_workers=self.workers)
+        limit = self.workers * PARALLEL_DEPTH
+        try:
+            if self.ordered:
+                pending: collections.deque = collections.deque()
+                for item in items:
+                    pending.append(executor.submit(self.function, item))
+                    if len(pending) >= limit:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            else:
+                running: set = set()
+                for item in items:
+                    running.add(executor.submit(self.function, item))
+                    if len(running) >= limit:
+                        done, running = wait(running, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+                for future in _as_completed(running):
+                    yield future.result()
+        finally:
+            # Stops queued work if the consumer stopped early or a call failed
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _as_completed(futures: set) -> Generator[Future, None, None]:
+    while futures:
+        done, futures = wait(futures, return_when=FIRST_COMPLETED)
+        yield from done
+
+
+class Sink(Stage):
+    """
+    Terminal stage calling function(item) for every item; yields nothing
+    """
+
+    def __init__(self, function: Callable[[Any], Any], name: Optional[str] = None):
+        super().__init__(name)
+        self.function = function
+
+    def process(self, items: Iterator[Any]) -> Iterator[Any]:
+        function = self.function
+        for item in items:
+            function(item)
+        # A generator, so nothing is consumed until the pipeline is iterated
+        yield from ()
+
+
+class Pipeline:
+    """
+    A source followed by stages, composed with `|`:
+
+        pipeline = (users(batch_size=1000)
+                    | Filter(lambda user: user['age'] > 25)
+                    | ParallelMap(enrich, workers=8)
+                    | Batch(500)
+                    | Sink(write_batch))
+        pipeline.run()
+        pipeline.stats()
+
+    Nothing runs until the pipeline is iterated or run(). With queue_size > 0
+    every stage runs on its own thread and hands items to the next stage
+    through a bounded queue of that size (seed.prefetched), so stages overlap
+    while a slow stage still blocks the ones before it.
+    """
+
+    def __init__(self, source: Union[Iterable[Any], Callable[[], Iterable[Any]]],
+                 name: str = 'source', queue_size: int = 0,
+                 stages: Optional[List[Stage]] = None):
+        """
+        Args:
+            source: Iterable, or a callable returning a fresh iterable per run
+            name: Name of the source in stats()
+            queue_size: Items buffered between stages (0 chains them in one thread)
+            stages: Initial stages (normally added with `|`)
+        """
+        self.source = source
+        self.name = name
+        self.queue_size = queue_size
+        self.stages = list(stages or [])
+        self._stats: List[StageStats] = []
+
+    def __or__(self, stage: Stage) -> 'Pipeline':
+        if not isinstance(stage, Stage):
+            raise TypeError(f"Cannot pipe into {type(stage).__name__}, expected a Stage")
+        return Pipeline(self.source, self.name, self.queue_size, self.stages + [stage])
+
+    @staticmethod
+    def _counted_in(items: Iterable[Any], stats: StageStats) -> Generator[Any, None, None]:
+        for item in items:
+            stats.items_in += 1
+            yield item
+
+    @staticmethod
+    def _counted_out(items: Iterable[Any], stats: StageStats) -> Generator[Any, None, None]:
+        stats.started = time.perf_counter()
+        try:
+            for item in items:
+                stats.items_out += 1
+                yield item
+        finally:
+            stats.finished = time.perf_counter()
+
+    def _stage_names(self) -> List[str]:
+        names = [self.name]
+        seen = collections.Counter(names)
+        for stage in self.stages:
+            seen[stage.name] += 1
+            names.append(stage.name if seen[stage.name] == 1 else f"{stage.name}_{seen[stage.name]}")
+        return names
+
+    def __iter__(self) -> Iterator[Any]:
+        names = self._stage_names()
+        self._stats = [StageStats(name) for name in names]
+
+        source = self.source() if callable(self.source) else self.source
+        items: Iterable[Any] = self._counted_out(source, self._stats[0])
+        for stage, stats in zip(self.stages, self._stats[1:]):
+            if self.queue_size:
+                items = prefetched(items, self.queue_size)
+            items = self._counted_out(stage.process(self._counted_in(items, stats)), stats)
+        return iter(items)
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Drains the pipeline and returns stats()
+        """
+        for _ in self:
+            pass
+        return self.stats()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns {stage name: items_in, items_out, seconds, items_per_sec} for
+        the current or last run, in pipeline order. items_per_sec uses the
+        larger of items_in and items_out.
+        """
+        return {stats.name: stats.result() for stats in self._stats}
+
+
+def users(batch_size: int = 1000, spec: Optional[QuerySpec] = None, row_format: str = 'dict',
+          prefetch: int = 0, queue_size: int = 0) -> Pipeline:
+    """
+    Pipeline source yielding single users from stream_users_in_batches
+    """
+    return user_batches(batch_size, spec, row_format, prefetch, queue_size) | Flatten()
+
+
+def user_batches(batch_size: int = 1000, spec: Optional[QuerySpec] = None, row_format: str = 'dict',
+                 prefetch: int = 0, queue_size: int = 0) -> Pipeline:
+    """
+    Pipeline source yielding the batches of stream_users_in_batches
+    """
+    return Pipeline(lambda: stream_users_in_batches(batch_size, spec, row_format, prefetch),
+                    name='users', queue_size=queue_size)
@@ -1,37 +1,838 @@
-import mysql.connector
-from mysql.connector import Error
 import uuid
 import csv
-from typing import Generator, Dict, Any, Optional
+import hashlib
+import math
+import struct
+import sys
+import mmap
+import os
+import time
+import queue
+import re
+import operator
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager, suppress
+from typing import Generator, Dict, Any, Optional, List, Tuple, Iterable, Callable, Union
+
+from backends import DB_ERRORS, LocalInfileUnavailable, backend_from_env, encode_key
+from instrumentation import BATCH_SIZE, CONNECTIONS_OPENED, ROWS_READ, ROWS_SKIPPED, ROWS_WRITTEN, get_instrumentation
+from parallel_csv import parallel_csv_rows
+
+# Backend-neutral name for `except` clauses (MySQL and SQLite errors)
+Error = DB_ERRORS
+
+# Connection object of the active backend (mysql.connector or backends.SQLiteConnection)
+Connection = Any
+
+# Column order used for every tuple-based insert into user_data
+USER_COLUMNS = ('user_id', 'name', 'email', 'age')
+
+# Every column of user_data, including the maintained change timestamp
+TABLE_COLUMNS = USER_COLUMNS + ('updated_at',)
+
+
+def chunked(iterable: Iterable[Any], size: int) -> Generator[List[Any], None, None]:
+    """
+    Groups items from an iterable into lists of at most `size` elements
+    """
+    if size < 1:
+        raise ValueError("Chunk size must be at least 1")
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Default number of rows pulled from the server per fetchmany() call when streaming.
+# Peak client memory of a stream is at most STREAM_FETCH_SIZE * STREAM_ROW_BYTES
+# + STREAM_BASELINE_BYTES, about 1 MB at 1000 (test_stream_memory.py checks this bound).
+STREAM_FETCH_SIZE = 1000
+
+# Upper bound on the client memory of one streamed user_data row as a Python
+# dict, including the fetched tuple it is built from (~0.9 KB measured)
+STREAM_ROW_BYTES = 1024
+
+# Fixed client memory of a stream on top of its rows: cursor state and buffers
+STREAM_BASELINE_BYTES = 64 * 1024
+
+
+def _row_bytes(rows: List[Any], sample: int = 8) -> int:
+    """
+    Estimates the client memory of a fetched block from its first rows
+    (container plus values; shared objects such as small ints are overcounted)
+    """
+    sampled = rows[:sample]
+    size = 0
+    for row in sampled:
+        values = row.values() if isinstance(row, dict) else row
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in values)
+    return size * len(rows) // len(sampled)
+
+
+# Default hard limits of AdaptiveBatchSize, in rows
+ADAPTIVE_MIN_SIZE = 100
+ADAPTIVE_MAX_SIZE = 100000
+
+
+class AdaptiveBatchSize:
+    """
+    Chooses the fetchmany() size of a stream from the batches already fetched.
+    After every fetch the per-row latency and memory are smoothed, and the
+    next size is the largest one expected to stay within both target_seconds
+    and memory_budget. It moves by at most a factor of two per batch and is
+    clamped to [min_size, max_size]. The row count of every fetched batch is
+    reported as the 'batch_size' gauge.
+
+    One instance follows one stream; create a new one per scan.
+    """
+
+    def __init__(self, initial: int = STREAM_FETCH_SIZE, min_size: int = ADAPTIVE_MIN_SIZE,
+                 max_size: int = ADAPTIVE_MAX_SIZE,
+                 target_seconds: float = 0.05, memory_budget: int = 8 * 1024 * 1024,
+                 smoothing: float = 0.5):
+        """
+        Args:
+            initial: Size of the first fetch, within [min_size, max_size]
+            min_size: Hard lower limit of the batch size
+            max_size: Hard upper limit of the batch size
+            target_seconds: Fetch latency aimed for per batch
+            memory_budget: Client memory aimed for per batch, in bytes
+            smoothing: Weight of the newest batch in the moving averages (0-1]
+        """
+        if not 1 <= min_size <= max_size:
+            raise ValueError("Batch size limits need 1 <= min_size <= max_size")
+        if not min_size <= initial <= max_size:
+            raise ValueError(f"Initial batch size {initial} is outside [{min_size}, {max_size}]")
+        if not 0 < smoothing <= 1:
+            raise ValueError("smoothing must be in (0, 1]")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.memory_budget = memory_budget
+        self.smoothing = smoothing
+        self.size = initial
+        self.seconds_per_row: Optional[float] = None
+        self.bytes_per_row: Optional[float] = None
+        self.batches = 0
+
+    def _smooth(self, average: Optional[float], value: float) -> float:
+        return value if average is None else average + self.smoothing * (value - average)
+
+    def update(self, rows: List[Any], seconds: float) -> int:
+        """
+        Records one fetched block and its latency, and returns the next size.
+        The empty fetch ending a stream is not a batch and is ignored.
+        """
+        if not rows:
+            return self.size
+        self.batches += 1
+        count = len(rows)
+        get_instrumentation().gauge(BATCH_SIZE, count)
+        self.seconds_per_row = self._smooth(self.seconds_per_row, seconds / count)
+        self.bytes_per_row = self._smooth(self.bytes_per_row, _row_bytes(rows) / count)
+
+        wanted = self.max_size
+        if self.seconds_per_row > 0:
+            wanted = min(wanted, int(self.target_seconds / self.seconds_per_row))
+        if self.bytes_per_row > 0:
+            wanted = min(wanted, int(self.memory_budget / self.bytes_per_row))
+        # A short block is the end of the result, not a signal to shrink
+        if count < self.size:
+            wanted = max(wanted, self.size)
+        wanted = min(max(wanted, self.size // 2), self.size * 2)
+        self.size = min(max(wanted, self.min_size), self.max_size)
+        return self.size
+
+
+def close_cursor(cursor: Any) -> None:
+    """
+    Closes a cursor unless its connection still has unread rows from an
+    abandoned unbuffered stream. mysql.connector refuses to close such a cursor,
+    so it is left for ConnectionPool.release to discard the whole connection.
+    """
+    connection = getattr(cursor, '_connection', None)
+    if connection is not None and getattr(connection, 'unread_result', False):
+        return
+    cursor.close()
+
+
+def stream_query(connection: Any, query: str, params: Optional[Iterable[Any]] = None,
+                 fetch_size: Union[int, AdaptiveBatchSize] = STREAM_FETCH_SIZE,
+                 dictionary: bool = False) -> Generator[List[Any], None, None]:
+    """
+    Streams the result of a query through an unbuffered (server-side) cursor.
+    Rows are read from the socket fetch_size at a time, so client memory stays
+    bounded by one fetch regardless of how many rows the query returns.
+
+    Args:
+        connection: Database connection
+        query: SQL query to execute
+        params: Query parameters
+        fetch_size: Number of rows requested per fetchmany() call, or an
+                    AdaptiveBatchSize choosing it batch by batch
+        dictionary: Yield rows as dictionaries instead of tuples
+
+    Yields:
+        Lists of at most fetch_size rows, exactly as returned by the cursor
+    """
+    sizer = fetch_size if isinstance(fetch_size, AdaptiveBatchSize) else None
+    if sizer is not None:
+        fetch_size = sizer.size
+    if fetch_size < 1:
+        raise ValueError("fetch_size must be at least 1")
+    metrics = get_instrumentation()
+    cursor = connection.cursor(buffered=False, dictionary=dictionary)
+    try:
+        start = time.perf_counter()
+        cursor.execute(query, tuple(params or ()))
+        metrics.observe('execute', time.perf_counter() - start)
+        while True:
+            start = time.perf_counter()
+            rows = cursor.fetchmany(fetch_size)
+            elapsed = time.perf_counter() - start
+            metrics.observe('fetch', elapsed)
+            if not rows:
+                break
+            if sizer is not None:
+                fetch_size = sizer.update(rows, elapsed)
+            metrics.count(ROWS_READ, len(rows))
+            yield rows
+    finally:
+        close_cursor(cursor)
+
+
+# Row representations the streaming generators can yield:
+#   'dict'    - one dict per row (default, built by the dictionary cursor)
+#   'tuple'   - the raw tuples returned by the cursor, in column order
+#   'record'  - UserRecord instances (__slots__, no per-row dict)
+#   'columns' - one dict of per-column lists per batch (age as an array)
+ROW_FORMATS = ('dict', 'tuple', 'record', 'columns')
+
+
+class UserRecord:
+    """
+    Compact user_data row. __slots__ avoids a per-instance __dict__, so a
+    record costs roughly a third of the memory of the equivalent dict.
+    Columns missing from a projection are None.
+    """
+    __slots__ = USER_COLUMNS
+
+    def __init__(self, user_id: Any = None, name: Any = None, email: Any = None, age: Any = None):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.age = age
+
+    @classmethod
+    def from_row(cls, columns: Tuple[str, ...], row: Tuple[Any, ...]) -> 'UserRecord':
+        """
+        Builds a record from a tuple whose values follow `columns`
+        """
+        if columns == USER_COLUMNS:
+            return cls(*row)
+        return cls(**dict(zip(columns, row)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the record as a plain dictionary
+        """
+        return {column: getattr(self, column) for column in USER_COLUMNS}
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, UserRecord):
+            return NotImplemented
+        return all(getattr(self, column) == getattr(other, column) for column in USER_COLUMNS)
+
+    def __hash__(self) -> int:
+        # Hashes the same fields __eq__ compares, so equal records collide
+        # in sets and dict keys; do not modify a record used as a key
+        return hash(tuple(getattr(self, column) for column in USER_COLUMNS))
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{column}={getattr(self, column)!r}" for column in USER_COLUMNS)
+        return f"UserRecord({fields})"
+
+
+def format_rows(rows: List[Tuple[Any, ...]], columns: Tuple[str, ...], row_format: str) -> Any:
+    """
+    Converts a block of tuple rows into the requested row format
+
+    Args:
+        rows: Tuples as returned by a non-dictionary cursor
+        columns: Column names matching the tuple positions
+        row_format: One of ROW_FORMATS
+
+    Returns:
+        A list of rows, or a {column: values} dict for the 'columns' format
+    """
+    if row_format == 'tuple':
+        return rows
+    if row_format == 'dict':
+        return [dict(zip(columns, row)) for row in rows]
+    if row_format == 'record':
+        if columns == USER_COLUMNS:
+            return [UserRecord(*row) for row in rows]
+        return [UserRecord.from_row(columns, row) for row in rows]
+    if row_format == 'columns':
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        batch = {column: list(column_values) for column, column_values in zip(columns, values)}
+        if 'age' in batch:
+            # Ages fit in a signed short; an array stores them unboxed
+            batch['age'] = array('h', (int(age) for age in batch['age']))
+        return batch
+    raise ValueError(f"Unknown row format {row_format!r}, expected one of {ROW_FORMATS}")
+
+
+def key_getter(row_format: str, columns: Tuple[str, ...], column: str = 'user_id') -> Callable[[Any], Any]:
+    """
+    Returns a function extracting `column` from a single row in the given
+    row format ('dict', 'tuple' or 'record')
+    """
+    if row_format == 'dict':
+        return lambda row: row[column]
+    if row_format == 'record':
+        return lambda row: getattr(row, column)
+    position = columns.index(column)
+    return lambda row: row[position]
+
+
+def stream_formatted(connection: Any, query: str, params: Optional[Iterable[Any]] = None,
+                     columns: Tuple[str, ...] = USER_COLUMNS,
+                     fetch_size: Union[int, AdaptiveBatchSize] = STREAM_FETCH_SIZE,
+                     row_format: str = 'dict') -> Generator[Any, None, None]:
+    """
+    stream_query variant that yields each fetched block in the requested row format.
+    The 'dict' format uses the dictionary cursor directly; every other format
+    fetches plain tuples so no intermediate dict is ever built.
+    """
+    if row_format not in ROW_FORMATS:
+        raise ValueError(f"Unknown row format {row_format!r}, expected one of {ROW_FORMATS}")
+    if row_format == 'dict':
+        yield from stream_query(connection, query, params, fetch_size, dictionary=True)
+        return
+    for rows in stream_query(connection, query, params, fetch_size):
+        yield format_rows(rows, columns, row_format)
+
+
+def prefetched(source: Iterable[Any], depth: int = 2) -> Generator[Any, None, None]:
+    """
+    Iterates `source` on a background thread, keeping up to `depth` items
+    ready in a bounded queue. Fetching the next page or batch then overlaps
+    with the consumer's processing of the current one.
+
+    If the consumer stops early (break / close()), the producer thread is
+    told to stop, the source generator is closed on that thread (returning
+    its pooled connection) and the thread is joined.
+
+    Args:
+        source: Iterable to run ahead of the consumer (usually a generator)
+        depth: Maximum number of items fetched ahead
+
+    Yields:
+        The items of source, in order
+    """
+    if depth < 1:
+        raise ValueError("Prefetch depth must be at least 1")
+
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item: Any) -> bool:
+        # Wake up regularly so a stopped consumer never leaves the thread blocked
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        iterator = iter(source)
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((done, e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close:
+                close()
+
+    producer = threading.Thread(target=produce, name='prefetch', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+class QuerySpec:
+    """
+    Small composable description of a user_data query: selected columns,
+    filters and ordering. Every builder method returns a new spec, so specs
+    can be shared and extended safely. to_sql() compiles it into a
+    parameterized SELECT so filtering and projection happen in MySQL.
+
+    Example:
+        spec = QuerySpec().where('age', '>', 25).select('user_id', 'age').order_by('age')
+    """
+
+    OPERATORS = ('=', '!=', '<', '<=', '>', '>=', 'LIKE', 'IN')
+
+    def __init__(self, columns: Iterable[str] = USER_COLUMNS,
+                 filters: Iterable[Tuple[str, str, Any]] = (),
+                 ordering: Iterable[Tuple[str, bool]] = ()):
+        self.columns = tuple(columns)
+        self.filters = tuple(filters)
+        self.ordering = tuple(ordering)
+        for column in self.columns:
+            self._check_column(column)
+        for column, op, _ in self.filters:
+            self._check_column(column)
+            if op not in self.OPERATORS:
+                raise ValueError(f"Unsupported operator {op!r}, expected one of {self.OPERATORS}")
+        for column, _ in self.ordering:
+            self._check_column(column)
+
+    @staticmethod
+    def _check_column(column: str) -> None:
+        # Column names are interpolated into SQL, so only known columns are allowed
+        if column not in TABLE_COLUMNS:
+            raise ValueError(f"Unknown column {column!r}, expected one of {TABLE_COLUMNS}")
+
+    def select(self, *columns: str) -> 'QuerySpec':
+        """
+        Returns a spec that only fetches the given columns
+        """
+        return QuerySpec(columns, self.filters, self.ordering)
+
+    def where(self, column: str, op: str, value: Any) -> 'QuerySpec':
+        """
+        Returns a spec with one more filter, combined with AND
+        """
+        return QuerySpec(self.columns, self.filters + ((column, op.upper(), value),), self.ordering)
+
+    def order_by(self, column: str, descending: bool = False) -> 'QuerySpec':
+        """
+        Returns a spec with one more ORDER BY key
+        """
+        return QuerySpec(self.columns, self.filters, self.ordering + ((column, descending),))
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        """
+        Evaluates the filters against a row in Python (for non-SQL sources)
+        """
+        for column, op, value in self.filters:
+            actual = row[column]
+            if op == 'IN':
+                ok = actual in value
+            elif op == 'LIKE':
+                ok = _like_to_regex(value).fullmatch(str(actual)) is not None
+            else:
+                ok = _COMPARATORS[op](actual, value)
+            if not ok:
+                return False
+        return True
+
+    def to_sql(self, table: str = 'user_data',
+               extra_conditions: Iterable[Tuple[str, Tuple[Any, ...]]] = ()) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Compiles the spec into (query, params) using %s placeholders
+
+        Args:
+            table: Table to select from
+            extra_conditions: Trusted (sql, params) fragments ANDed with the
+                              filters, e.g. a partition predicate; user_id
+                              params must already be in key_param() form
+
+        Returns:
+            Tuple of (query, params)
+        """
+        params: List[Any] = []
+        conditions = []
+        for condition, condition_params in extra_conditions:
+            conditions.append(condition)
+            params.extend(condition_params)
+        key_param = get_backend().key_param
+        for column, op, value in self.filters:
+            # Only values compared with user_id take the stored key form
+            convert = key_param if column == 'user_id' else (lambda item: item)
+            if op == 'IN':
+                values = [convert(item) for item in value]
+                if not values:
+                    conditions.append("1 = 0")
+                    continue
+                conditions.append(f"{column} IN ({', '.join(['%s'] * len(values))})")
+                params.extend(values)
+            else:
+                conditions.append(f"{column} {op} %s")
+                params.append(convert(value))
+
+        query = f"SELECT {', '.join(self.columns)} FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if self.ordering:
+            query += " ORDER BY " + ", ".join(
+                f"{column} DESC" if descending else column for column, descending in self.ordering
+            )
+        return query, tuple(params)
+
+
+_COMPARATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def _like_to_regex(pattern: str) -> 're.Pattern':
+    """
+    Translates a SQL LIKE pattern (% and _) into a case-insensitive regex
+    """
+    parts = (
+        '.*' if char == '%' else '.' if char == '_' else re.escape(char)
+        for char in pattern
+    )
+    return re.compile(''.join(parts), re.IGNORECASE | re.DOTALL)
+
+
+class MappedCSVReader:
+    """
+    Reads a user_data CSV through a read-only memory map. Lines are found with
+    bytes.find on the mapped pages and split directly, with no Python text I/O
+    layer or read buffer in between; repeated reloads of the same file are
+    served straight from the page cache. Only lines containing quotes go
+    through the csv module. Quoted fields must not contain newlines.
+
+    An optional sparse offset index (`<path>.idx`, one byte offset every
+    INDEX_STRIDE rows) lets rows(start_row=N) seek close to row N instead of
+    scanning from the top; it is rebuilt when the CSV's size or mtime changes.
+
+    Example:
+        with MappedCSVReader('user_data.csv', use_index=True) as reader:
+            for line_num, row in reader.rows(start_row=500000):
+                ...
+    """
+    INDEX_STRIDE = 1024
+    # Bytes decoded and tokenized at a time
+    BLOCK_BYTES = 1024 * 1024
+    # Index header: CSV size, CSV mtime_ns, stride
+    _INDEX_HEADER = 3
+
+    def __init__(self, path: str, use_index: bool = False, index_path: Optional[str] = None):
+        """
+        Args:
+            path: CSV file to read
+            use_index: Seek with the sparse offset index in rows(start_row)
+            index_path: Where the index is stored (defaults to `<path>.idx`)
+        """
+        self.path = path
+        self.index_path = index_path or f"{path}.idx"
+        self.use_index = use_index
+        self._file = open(path, 'rb')
+        self._map: Any = b''
+        try:
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                pass
+            if hasattr(self._map, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                # Read ahead aggressively and let the kernel drop pages behind us
+                self._map.madvise(mmap.MADV_SEQUENTIAL)
+            header_end = self._line_end(0)
+            self.header = next(csv.reader([self._map[:header_end].decode('utf-8').rstrip('\r\n')]), [])
+        except BaseException:
+            # The caller never gets an object to close
+            self.close()
+            raise
+        self._data_start = header_end
+        self._index: Optional[array] = None
+
+    def __enter__(self) -> 'MappedCSVReader':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def _line_end(self, position: int) -> int:
+        """
+        Returns the offset just past the newline ending the line at `position`
+        """
+        end = self._map.find(b'\n', position)
+        return len(self._map) if end < 0 else end + 1
+
+    def _stamp(self) -> Tuple[int, int, int]:
+        status = os.stat(self.path)
+        return status.st_size, status.st_mtime_ns, self.INDEX_STRIDE
+
+    def build_index(self) -> array:
+        """
+        Scans the file once and writes the offset index atomically to
+        index_path. If that location is not writable (e.g. a read-only data
+        directory) the index is only kept in memory for this reader.
+        """
+        offsets = array('Q', self._stamp())
+        position = self._data_start
+        row = 0
+        while position < len(self._map):
+            if row % self.INDEX_STRIDE == 0:
+                offsets.append(position)
+            position = self._line_end(position)
+            row += 1
+        temp_path = f"{self.index_path}.tmp"
+        try:
+            with open(temp_path, 'wb') as index_file:
+                offsets.tofile(index_file)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"Cannot write offset index {self.index_path} ({e}), keeping it in memory")
+            with suppress(OSError):
+                os.remove(temp_path)
+        self._index = offsets
+        return offsets
+
+    def load_index(self) -> array:
+        """
+        Returns the offset index, rebuilding it if missing or stale
+        """
+        if self._index is not None:
+            return self._index
+        offsets = array('Q')
+        try:
+            with open(self.index_path, 'rb') as index_file:
+                offsets.frombytes(index_file.read())
+        except FileNotFoundError:
+            return self.build_index()
+        if tuple(offsets[:self._INDEX_HEADER]) != self._stamp():
+            return self.build_index()
+        self._index = offsets
+        return offsets
+
+    def offset_of(self, row: int) -> int:
+        """
+        Returns the byte offset of data row `row` (0 is the first line after
+        the header), or the file size if the file has fewer rows
+        """
+        position, skip = self._data_start, row
+        if self.use_index:
+            offsets = self.load_index()
+            entries = len(offsets) - self._INDEX_HEADER
+            if entries:
+                entry = min(row // self.INDEX_STRIDE, entries - 1)
+                position = offsets[self._INDEX_HEADER + entry]
+                skip = row - entry * self.INDEX_STRIDE
+        for _ in range(skip):
+            if position >= len(self._map):
+                break
+            position = self._line_end(position)
+        return position
+
+    def rows(self, start_row: int = 0) -> Generator[Tuple[int, Dict[str, Optional[str]]], None, None]:
+        """
+        Yields (line number, {column: value}) for every data row from
+        `start_row` on. Line numbers count the header as line 1, like
+        csv.DictReader; blank lines are skipped and short rows padded with None.
+        """
+        data = self._map
+        header = self.header
+        width = len(header)
+        size = len(data)
+        position = self.offset_of(start_row)
+        line_num = start_row + 1
+        while position < size:
+            # Decode a newline-aligned block at once: per-line slicing and
+            # decoding would cost more than the tokenizing itself
+            end = min(position + self.BLOCK_BYTES, size)
+            if end < size:
+                end = self._line_end(end)
+            text = data[position:end].decode('utf-8')
+            position = end
+            # Only \n ends a line, matching the offsets in the index
+            lines = text.split('\n')
+            if text.endswith('\n'):
+                lines.pop()
+            if '\r' in text:
+                lines = [line[:-1] if line.endswith('\r') else line for line in lines]
+            if any('"' in line for line in lines):
+                tokenized = csv.reader(lines)
+            else:
+                tokenized = (line.split(',') if line else [] for line in lines)
+            for fields in tokenized:
+                line_num += 1
+                if not fields:
+                    continue
+                if len(fields) < width:
+                    fields += [None] * (width - len(fields))
+                yield line_num, dict(zip(header, fields))
+
+
+class BloomFilter:
+    """
+    Compact probabilistic set of string keys. Membership tests never give
+    false negatives; false positives happen at roughly `error_rate` and must
+    be confirmed with an exact check. Memory is about 1.2 bytes per key at a
+    1% error rate, against ~100 bytes per key for a Python set of strings.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.bit_count = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+
+    def _positions(self, key: str) -> Generator[int, None, None]:
+        # Double hashing: k positions derived from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for index in range(self.hash_count):
+            yield (first + index * second) % self.bit_count
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class KeySet:
+    """
+    Exact set of user_id keys stored compactly. Canonical UUID strings are
+    kept as their 16 bytes in an open-addressing table inside one bytearray,
+    which costs 23 to 46 bytes per key depending on how full the table is,
+    against ~90 bytes per key for a Python set. Other keys fall back to a
+    plain set.
+    """
+
+    # Fraction of slots in use before the table doubles
+    MAX_LOAD = 0.7
+
+    # Marks an empty slot; the nil UUID itself is tracked in has_nil
+    _EMPTY = bytes(16)
+
+    def __init__(self, capacity: int = 1024):
+        self.slot_count = 1 << max(4, math.ceil(math.log2(max(1, capacity) / self.MAX_LOAD)))
+        self.table = bytearray(self.slot_count * 16)
+        self.used = 0
+        self.has_nil = False
+        self.others: set = set()
+
+    def __len__(self) -> int:
+        return self.used + self.has_nil + len(self.others)
+
+    def _find(self, packed: bytes) -> int:
+        # Linear probing: returns the byte offset of the key's slot, or of the
+        # empty slot it belongs in
+        table, empty = self.table, self._EMPTY
+        mask = self.slot_count - 1
+        index = hash(packed) & mask
+        while True:
+            offset = index << 4
+            current = table[offset:offset + 16]
+            if current == packed or current == empty:
+                return offset
+            index = (index + 1) & mask
+
+    def _grow(self) -> None:
+        old_table = self.table
+        self.slot_count *= 2
+        self.table = bytearray(self.slot_count * 16)
+        empty = self._EMPTY
+        table = self.table
+        for (packed,) in struct.iter_unpack('16s', old_table):
+            if packed != empty:
+                slot = self._find(packed)
+                table[slot:slot + 16] = packed
+
+    def add(self, key: str) -> bool:
+        """
+        Adds a key and returns True if it was not in the set yet
+        """
+        packed = encode_key(key)
+        if not isinstance(packed, bytes):
+            if key in self.others:
+                return False
+            self.others.add(key)
+            return True
+        if packed == self._EMPTY:
+            added, self.has_nil = not self.has_nil, True
+            return added
+        offset = self._find(packed)
+        if self.table[offset:offset + 16] == packed:
+            return False
+        self.table[offset:offset + 16] = packed
+        self.used += 1
+        if self.used > self.slot_count * self.MAX_LOAD:
+            self._grow()
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        packed = encode_key(key)
+        if not isinstance(packed, bytes):
+            return key in self.others
+        if packed == self._EMPTY:
+            return self.has_nil
+        offset = self._find(packed)
+        return self.table[offset:offset + 16] == packed
+
 
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, backend: Optional[Any] = None):
+        """
+        Args:
+            backend: Storage backend (backends.MySQLBackend or SQLiteBackend);
+                     defaults to the process-wide backend from get_backend()
+        """
+        self.backend = backend or get_backend()
         self.connection = None
     
-    def connect_db(self) -> mysql.connector.connection.MySQLConnection:
+    def connect_db(self) -> Connection:
         """
-        Connects to the MySQL database server
+        Connects to the database server
         """
         try:
-            connection = mysql.connector.connect(
-                host='localhost',
-                user='root',  # Change as per your setup
-                password=''   # Change as per your setup
-            )
+            connection = self.backend.connect_server()
             if connection.is_connected():
-                print("Connected to MySQL server")
+                print(f"Connected to {self.backend.name} server")
                 return connection
         except Error as e:
-            print(f"Error while connecting to MySQL: {e}")
+            print(f"Error while connecting to {self.backend.name}: {e}")
             raise
     
-    def create_database(self, connection: mysql.connector.connection.MySQLConnection) -> None:
+    def create_database(self, connection: Connection) -> None:
         """
         Creates the database ALX_prodev if it does not exist
         """
         try:
             cursor = connection.cursor()
-            cursor.execute("CREATE DATABASE IF NOT EXISTS ALX_prodev")
+            self.backend.create_database(cursor)
             print("Database ALX_prodev created or already exists")
         except Error as e:
             print(f"Error creating database: {e}")
@@ -40,41 +841,30 @@ class DatabaseManager:
             if cursor:
                 cursor.close()
     
-    def connect_to_prodev(self) -> mysql.connector.connection.MySQLConnection:
+    def connect_to_prodev(self) -> Connection:
         """
-        Connects to the ALX_prodev database in MySQL
+        Connects to the ALX_prodev database
         """
+        metrics = get_instrumentation()
         try:
-            connection = mysql.connector.connect(
-                host='localhost',
-                user='root',      # Change as per your setup
-                password='',      # Change as per your setup
-                database='ALX_prodev'
-            )
+            with metrics.timed('connect'):
+                connection = self.backend.connect()
             if connection.is_connected():
-                print("Connected to ALX_prodev database")
+                metrics.count(CONNECTIONS_OPENED)
                 self.connection = connection
                 return connection
         except Error as e:
             print(f"Error while connecting to ALX_prodev database: {e}")
             raise
     
-    def create_table(self, connection: mysql.connector.connection.MySQLConnection) -> None:
+    def create_table(self, connection: Connection) -> None:
         """
         Creates a table user_data if it does not exist with the required fields
+        and indexes (DDL is backend specific)
         """
         try:
             cursor = connection.cursor()
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS user_data (
-                user_id VARCHAR(36) PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                email VARCHAR(255) NOT NULL,
-                age DECIMAL(3,0) NOT NULL,
-                INDEX idx_user_id (user_id)
-            )
-            """
-            cursor.execute(create_table_query)
+            self.backend.create_table(cursor)
             connection.commit()
             print("Table user_data created or already exists")
         except Error as e:
@@ -83,34 +873,71 @@ class DatabaseManager:
         finally:
             if cursor:
                 cursor.close()
-    
-    def insert_data(self, connection: mysql.connector.connection.MySQLConnection, data: Dict[str, Any]) -> None:
+
+    def migrate_user_ids(self, connection: Connection, key_format: Optional[str] = None) -> bool:
+        """
+        Converts an existing user_data table to another user_id storage format
+        (see backends.KEY_FORMATS), e.g. VARCHAR(36) to BINARY(16). The table is
+        rebuilt and swapped in, so plan for a copy of the table's size on disk.
+
+        Args:
+            connection: Database connection
+            key_format: Target format; defaults to the backend's USER_ID_FORMAT
+
+        Returns:
+            True if the table was converted, False if it already used key_format
+        """
+        key_format = key_format or self.backend.key_format
+        try:
+            cursor = connection.cursor()
+            start = time.perf_counter()
+            migrated = self.backend.migrate_key_format(cursor, key_format)
+            connection.commit()
+            if migrated:
+                print(f"user_data migrated to {key_format!r} user_id keys in {time.perf_counter() - start:.2f}s")
+            else:
+                print(f"user_data already stores {key_format!r} user_id keys")
+            return migrated
+        except Error as e:
+            connection.rollback()
+            print(f"Error migrating user_id keys: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    def insert_data(self, connection: Connection, data: Dict[str, Any]) -> None:
         """
-        Inserts data in the database if it does not exist
+        Inserts data in the database if it does not exist.
+        Outcomes are reported to the instrumentation as rows_written /
+        rows_skipped instead of being printed per row.
         """
+        metrics = get_instrumentation()
         try:
             cursor = connection.cursor()
             
             # Check if user already exists
             check_query = "SELECT user_id FROM user_data WHERE user_id = %s"
-            cursor.execute(check_query, (data['user_id'],))
-            existing_user = cursor.fetchone()
+            with metrics.timed('lookup'):
+                cursor.execute(check_query, (self.backend.key_param(data['user_id']),))
+                existing_user = cursor.fetchone()
             
             if not existing_user:
                 insert_query = """
                 INSERT INTO user_data (user_id, name, email, age)
                 VALUES (%s, %s, %s, %s)
                 """
-                cursor.execute(insert_query, (
-                    data['user_id'],
-                    data['name'],
-                    data['email'],
-                    data['age']
-                ))
-                connection.commit()
-                print(f"Inserted user: {data['name']}")
+                with metrics.timed('insert'):
+                    cursor.execute(insert_query, (
+                        self.backend.key_param(data['user_id']),
+                        data['name'],
+                        data['email'],
+                        data['age']
+                    ))
+                    connection.commit()
+                metrics.count(ROWS_WRITTEN)
             else:
-                print(f"User {data['name']} already exists")
+                metrics.count(ROWS_SKIPPED)
                 
         except Error as e:
             print(f"Error inserting data: {e}")
@@ -119,23 +946,121 @@ class DatabaseManager:
             if cursor:
                 cursor.close()
     
-    def load_data_from_csv(self, connection: mysql.connector.connection.MySQLConnection, csv_file_path: str) -> None:
+    def insert_batch(self, connection: Connection,
+                     rows: List[Tuple[str, str, str, int]], on_duplicate: str = 'ignore') -> int:
+        """
+        Inserts a chunk of rows with a single multi-row INSERT statement.
+        The caller is responsible for committing.
+
+        Args:
+            connection: Database connection
+            rows: List of (user_id, name, email, age) tuples
+            on_duplicate: 'ignore' keeps existing rows (INSERT IGNORE),
+                          'update' overwrites them (ON DUPLICATE KEY UPDATE);
+                          the backend supplies the matching dialect
+
+        Returns:
+            Number of rows reported as affected by the server
+        """
+        if not rows:
+            return 0
+        if on_duplicate not in ('ignore', 'update'):
+            raise ValueError("on_duplicate must be 'ignore' or 'update'")
+
+        # Stay under the backend's placeholder limit by splitting large chunks
+        rows_per_statement = max(1, self.backend.max_params // len(USER_COLUMNS))
+
+        metrics = get_instrumentation()
+        key_param = self.backend.key_param
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            affected = 0
+            for start in range(0, len(rows), rows_per_statement):
+                statement_rows = rows[start:start + rows_per_statement]
+                query = self.backend.insert_rows_sql(USER_COLUMNS, len(statement_rows), on_duplicate)
+                params = []
+                for user_id, *values in statement_rows:
+                    params.append(key_param(user_id))
+                    params.extend(values)
+                with metrics.timed('insert_batch'):
+                    cursor.execute(query, params)
+                affected += cursor.rowcount
+                if on_duplicate == 'ignore':
+                    metrics.count(ROWS_WRITTEN, cursor.rowcount)
+                    metrics.count(ROWS_SKIPPED, len(statement_rows) - cursor.rowcount)
+                else:
+                    # Updated rows count twice in rowcount; every row sent was written
+                    metrics.count(ROWS_WRITTEN, len(statement_rows))
+            return affected
+        except Error as e:
+            print(f"Error inserting batch: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    @staticmethod
+    def normalize_row(row: Dict[str, str]) -> Tuple[str, str, str, int]:
+        """
+        Converts a CSV row into a (user_id, name, email, age) tuple,
+        generating a UUID when user_id is missing and coercing whole-number
+        ages written as floats ("67.0") to int
+        """
+        user_id = row.get('user_id') or str(uuid.uuid4())
+        if row['age'] is None:
+            raise ValueError("age column is missing")
+        age = row['age'].strip()
+        try:
+            age = int(age)
+        except ValueError:
+            value = float(age)
+            if not value.is_integer():
+                raise ValueError(f"age {age!r} is not a whole number")
+            age = int(value)
+        return (user_id, row['name'], row['email'], age)
+
+    def load_data_from_csv(self, connection: Connection, csv_file_path: str,
+                           batch_size: Optional[int] = None,
+                           on_duplicate: str = 'ignore',
+                           dedup: bool = False,
+                           workers: Optional[int] = None) -> Optional[Dict[str, Any]]:
         """
         Loads data from CSV file into the database
+
+        Args:
+            connection: Database connection
+            csv_file_path: Path to the CSV file
+            batch_size: When set, rows are written in chunks of this size with
+                        multi-row INSERTs and one commit per chunk
+            on_duplicate: Duplicate key policy for bulk mode ('ignore' or 'update')
+            dedup: Bulk mode only; drop duplicate keys within the file and keys
+                   already in the table before they reach the database
+            workers: Bulk mode only; parse the file on this many processes
+
+        Returns:
+            Ingest statistics in bulk mode, None in row-by-row mode
+
+        Raises:
+            ValueError: dedup or workers given without batch_size
         """
+        if batch_size is None and (dedup or workers):
+            raise ValueError("dedup and workers need bulk mode; pass batch_size as well")
+        if batch_size is not None:
+            return self.bulk_load_csv(connection, csv_file_path, batch_size, on_duplicate, dedup, workers)
+
         try:
             with open(csv_file_path, 'r', newline='', encoding='utf-8') as csvfile:
                 csv_reader = csv.DictReader(csvfile)
                 
                 for row in csv_reader:
-                    # Generate UUID if not present in CSV
-                    user_id = row.get('user_id') or str(uuid.uuid4())
+                    user_id, name, email, age = self.normalize_row(row)
                     
                     data = {
                         'user_id': user_id,
-                        'name': row['name'],
-                        'email': row['email'],
-                        'age': int(row['age'])
+                        'name': name,
+                        'email': email,
+                        'age': age
                     }
                     
                     self.insert_data(connection, data)
@@ -147,11 +1072,319 @@ class DatabaseManager:
         except Exception as e:
             print(f"Error loading data from CSV: {e}")
             raise
+        return None
+
+    def load_existing_keys(self, connection: Connection, extra_capacity: int = 0,
+                           error_rate: float = 0.01) -> BloomFilter:
+        """
+        Streams every user_id already in user_data into a BloomFilter sized
+        for those keys plus `extra_capacity` keys added later
+        """
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM user_data")
+            existing = cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+        keys = BloomFilter(existing + extra_capacity, error_rate)
+        for rows in stream_query(connection, "SELECT user_id FROM user_data"):
+            for (user_id,) in rows:
+                keys.add(user_id)
+        return keys
+
+    def existing_keys(self, connection: Connection, user_ids: List[str]) -> set:
+        """
+        Exact check: returns which of `user_ids` are already in user_data,
+        using one IN query per statement-sized group
+        """
+        found = set()
+        cursor = connection.cursor()
+        try:
+            for group in chunked(user_ids, self.backend.max_params):
+                placeholders = ", ".join(["%s"] * len(group))
+                cursor.execute(f"SELECT user_id FROM user_data WHERE user_id IN ({placeholders})",
+                               [self.backend.key_param(user_id) for user_id in group])
+                found.update(row[0] for row in cursor.fetchall())
+        finally:
+            cursor.close()
+        return found
+
+    def dedup_chunk(self, connection: Connection, chunk: List[Tuple[str, str, str, int]],
+                    keys: Optional[BloomFilter], seen: KeySet, on_duplicate: str,
+                    stats: Dict[str, Any]) -> List[Tuple[str, str, str, int]]:
+        """
+        Removes duplicate keys from a chunk before it is written.
+
+        Keys repeated within the file are found exactly through `seen`, the
+        KeySet of every earlier key of this file. 'ignore' keeps the first row
+        of such a key and 'update' the last. In 'ignore' mode, a new key that
+        `keys` (the BloomFilter of the table) reports as possibly present is
+        confirmed with one exact IN query for the whole chunk. The query is
+        skipped only when no key in the chunk hits the filter, which for new
+        keys happens with probability about 1 - error_rate per key. 'update'
+        mode writes table hits anyway, so it needs no `keys`.
+        """
+        unique: Dict[str, Tuple[str, str, str, int]] = {}
+        candidates = []
+        for row in chunk:
+            user_id = row[0]
+            if not seen.add(user_id):
+                stats['duplicates_in_file'] += 1
+                if on_duplicate == 'ignore':
+                    stats['duplicates'] += 1
+                    continue
+            elif keys is not None and user_id in keys:
+                candidates.append(user_id)
+            unique[user_id] = row
+
+        if candidates:
+            stats['exact_checks'] += len(candidates)
+            for user_id in self.existing_keys(connection, candidates):
+                del unique[user_id]
+                stats['duplicates'] += 1
+        return list(unique.values())
+
+    def bulk_load_csv(self, connection: Connection, csv_file_path: str,
+                      batch_size: int = 1000, on_duplicate: str = 'ignore',
+                      dedup: bool = False, workers: Optional[int] = None,
+                      mapped: bool = False, start_row: int = 0,
+                      report: bool = True) -> Dict[str, Any]:
+        """
+        Loads a CSV file in chunks using multi-row INSERTs, committing once per chunk.
+        Rows that cannot be parsed are rejected and reported with their line number.
+
+        Args:
+            connection: Database connection
+            csv_file_path: Path to the CSV file
+            batch_size: Number of rows per INSERT statement / transaction
+            on_duplicate: 'ignore' or 'update' (see insert_batch)
+            dedup: Drop duplicate keys before writing: exactly within the file
+                   (KeySet), and with 'ignore' against the table through a
+                   BloomFilter of its keys confirmed by batched IN queries
+            workers: Parse and normalize the file on this many processes
+                     (parallel_csv) while this process writes; None parses inline
+            mapped: Read through MappedCSVReader instead of Python text I/O
+                    (not with workers)
+            start_row: With mapped, skip the first start_row data rows using the
+                       reader's offset index (partial reload; not with workers)
+            report: Print the summary line at the end
+
+        Returns:
+            Dictionary with rows_read, rows_inserted, duplicates, rejected,
+            batches, elapsed and rows_per_sec (plus duplicates_in_file and
+            exact_checks with dedup)
+        """
+        if start_row and not mapped:
+            raise ValueError("start_row needs mapped=True")
+        if workers and mapped:
+            # parallel_csv plans its own byte ranges over the whole file
+            raise ValueError("workers cannot be combined with mapped or start_row")
+        stats = {
+            'rows_read': 0,
+            'rows_inserted': 0,
+            'duplicates': 0,
+            'rejected': 0,
+            'batches': 0,
+            'elapsed': 0.0,
+            'rows_per_sec': 0.0,
+        }
+        start = time.perf_counter()
+
+        def parsed_rows(numbered_rows: Iterable[Tuple[int, Dict[str, Optional[str]]]]
+                        ) -> Generator[Tuple[str, str, str, int], None, None]:
+            for line_num, row in numbered_rows:
+                stats['rows_read'] += 1
+                try:
+                    yield self.normalize_row(row)
+                except (KeyError, ValueError, TypeError) as e:
+                    stats['rejected'] += 1
+                    print(f"Rejected line {line_num}: {e}")
+
+        def source_rows() -> Generator[Tuple[str, str, str, int], None, None]:
+            if workers:
+                yield from parallel_csv_rows(csv_file_path, self.normalize_row, workers, stats=stats)
+                return
+            if mapped:
+                with MappedCSVReader(csv_file_path, use_index=start_row > 0) as reader:
+                    yield from parsed_rows(reader.rows(start_row))
+                return
+            with open(csv_file_path, 'r', newline='', encoding='utf-8') as csvfile:
+                csv_reader = csv.DictReader(csvfile)
+                yield from parsed_rows((csv_reader.line_num, row) for row in csv_reader)
+
+        try:
+            keys = seen = None
+            if dedup:
+                stats['duplicates_in_file'] = 0
+                stats['exact_checks'] = 0
+                seen = KeySet()
+                if on_duplicate == 'ignore':
+                    # Only 'ignore' drops rows whose key is already in the table
+                    keys = self.load_existing_keys(connection)
+
+            for chunk in chunked(source_rows(), batch_size):
+                if seen is not None:
+                    chunk = self.dedup_chunk(connection, chunk, keys, seen, on_duplicate, stats)
+                if not chunk:
+                    continue
+                affected = self.insert_batch(connection, chunk, on_duplicate)
+                connection.commit()
+                stats['batches'] += 1
+                if on_duplicate == 'ignore':
+                    stats['rows_inserted'] += affected
+                    stats['duplicates'] += len(chunk) - affected
+                else:
+                    # ON DUPLICATE KEY UPDATE reports 2 per updated row, so
+                    # only the number of rows sent is meaningful here
+                    stats['rows_inserted'] += len(chunk)
+        except FileNotFoundError:
+            print(f"CSV file {csv_file_path} not found")
+            return stats
+        except Exception as e:
+            connection.rollback()
+            print(f"Error loading data from CSV: {e}")
+            raise
+
+        stats['elapsed'] = time.perf_counter() - start
+        if stats['elapsed'] > 0:
+            stats['rows_per_sec'] = stats['rows_read'] / stats['elapsed']
+        if report:
+            print(
+                f"Bulk load completed: {stats['rows_read']} rows read, "
+                f"{stats['rows_inserted']} written, {stats['duplicates']} duplicates, "
+                f"{stats['rejected']} rejected in {stats['batches']} batches "
+                f"({stats['rows_per_sec']:.0f} rows/sec)"
+            )
+        return stats
     
-    def stream_rows(self, connection: Optional[mysql.connector.connection.MySQLConnection] = None, 
-                   batch_size: int = 100) -> Generator[Dict[str, Any], None, None]:
+    def normalize_csv(self, csv_file_path: str, output_path: str) -> Dict[str, int]:
+        """
+        Streams a user_data CSV into a normalized copy: a header line, then
+        user_id,name,email,age rows with generated UUIDs for missing user_ids
+        and integer ages. Lines that cannot be parsed are skipped and reported
+        with their line number, as in bulk_load_csv.
+
+        Returns:
+            Dictionary with rows_read, rows_written and rejected
+        """
+        stats = {'rows_read': 0, 'rows_written': 0, 'rejected': 0}
+        with open(csv_file_path, 'r', newline='', encoding='utf-8') as source, \
+                open(output_path, 'w', newline='', encoding='utf-8') as output:
+            csv_reader = csv.DictReader(source)
+            # LOAD DATA is told to expect exactly these line endings and quotes
+            writer = csv.writer(output, lineterminator='\n')
+            writer.writerow(USER_COLUMNS)
+            for row in csv_reader:
+                stats['rows_read'] += 1
+                try:
+                    writer.writerow(self.normalize_row(row))
+                    stats['rows_written'] += 1
+                except (KeyError, ValueError, TypeError) as e:
+                    stats['rejected'] += 1
+                    print(f"Rejected line {csv_reader.line_num}: {e}")
+        return stats
+
+    def load_data_infile(self, connection: Connection, csv_file_path: str,
+                         on_duplicate: str = 'ignore', batch_size: int = 10000,
+                         temp_dir: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Fast path for very large CSV files. The file is normalized in one
+        streaming pass into a temporary file, which the server reads with
+        LOAD DATA LOCAL INFILE into a staging table and merges into user_data
+        with a single INSERT ... SELECT. When local infile is not allowed
+        (SQLite, MYSQL_LOCAL_INFILE unset, or local_infile=OFF on the server)
+        the normalized file is loaded with bulk_load_csv instead.
+
+        Args:
+            connection: Database connection
+            csv_file_path: Path to the CSV file
+            on_duplicate: 'ignore' or 'update' (see insert_batch)
+            batch_size: Rows per INSERT for the batched fallback
+            temp_dir: Directory of the normalized copy, which is about as large
+                      as the CSV; defaults to the CSV's own directory because
+                      the system temp dir is often a small tmpfs
+
+        Returns:
+            Dictionary with rows_read, rows_inserted, duplicates, rejected,
+            elapsed, rows_per_sec and method ('load_data' or 'batched')
+        """
+        if on_duplicate not in ('ignore', 'update'):
+            raise ValueError("on_duplicate must be 'ignore' or 'update'")
+        start = time.perf_counter()
+        if temp_dir is None:
+            temp_dir = os.path.dirname(os.path.abspath(csv_file_path))
+        with tempfile.NamedTemporaryFile(prefix='user_data_', suffix='.csv', dir=temp_dir,
+                                         delete=False) as temp_file:
+            normalized_path = temp_file.name
+        try:
+            try:
+                prepared = self.normalize_csv(csv_file_path, normalized_path)
+            except FileNotFoundError:
+                print(f"CSV file {csv_file_path} not found")
+                return {'rows_read': 0, 'rows_inserted': 0, 'duplicates': 0, 'rejected': 0,
+                        'elapsed': 0.0, 'rows_per_sec': 0.0, 'method': None}
+
+            cursor = connection.cursor()
+            try:
+                staged, affected = self.backend.load_infile(cursor, normalized_path, on_duplicate)
+                connection.commit()
+                method = 'load_data'
+            except LocalInfileUnavailable as e:
+                connection.rollback()
+                print(f"LOAD DATA LOCAL INFILE unavailable ({e}), falling back to batched inserts")
+                # The summary below covers the whole load, so the batched
+                # loader does not print its own
+                batched = self.bulk_load_csv(connection, normalized_path, batch_size, on_duplicate,
+                                             report=False)
+                method = 'batched'
+            except Error as e:
+                connection.rollback()
+                print(f"Error loading data with LOAD DATA LOCAL INFILE: {e}")
+                raise
+            finally:
+                cursor.close()
+        finally:
+            os.remove(normalized_path)
+
+        if method == 'batched':
+            # bulk_load_csv already counted its rows in the instrumentation
+            inserted, duplicates = batched['rows_inserted'], batched['duplicates']
+            rejected = prepared['rejected'] + batched['rejected']
+        else:
+            metrics = get_instrumentation()
+            if on_duplicate == 'ignore':
+                inserted, duplicates = affected, staged - affected
+                metrics.count(ROWS_SKIPPED, duplicates)
+            else:
+                # ON DUPLICATE KEY UPDATE reports 2 per updated row (see bulk_load_csv)
+                inserted, duplicates = staged, 0
+            metrics.count(ROWS_WRITTEN, inserted)
+            rejected = prepared['rejected']
+        elapsed = time.perf_counter() - start
+        stats = {
+            'rows_read': prepared['rows_read'],
+            'rows_inserted': inserted,
+            'duplicates': duplicates,
+            'rejected': rejected,
+            'elapsed': elapsed,
+            'rows_per_sec': prepared['rows_read'] / elapsed if elapsed else 0.0,
+            'method': method,
+        }
+        if method == 'batched':
+            stats['batches'] = batched['batches']
+        label = 'LOAD DATA' if method == 'load_data' else 'Batched load'
+        print(
+            f"{label} completed: {stats['rows_read']} rows read, {inserted} written, "
+            f"{duplicates} duplicates, {rejected} rejected ({stats['rows_per_sec']:.0f} rows/sec)"
+        )
+        return stats
+
+    def stream_rows(self, connection: Optional[Connection] = None, 
+                   batch_size: int = STREAM_FETCH_SIZE) -> Generator[Dict[str, Any], None, None]:
         """
         Generator that streams rows from the user_data table one by one
+        through an unbuffered cursor (see stream_query)
         
         Args:
             connection: Database connection (uses self.connection if None)
@@ -164,28 +1397,15 @@ class DatabaseManager:
         if not conn:
             raise ValueError("No database connection provided")
         
-        cursor = None
         try:
-            # Use server-side cursor for efficient memory usage
-            cursor = conn.cursor(dictionary=True)
-            
             query = "SELECT user_id, name, email, age FROM user_data"
-            cursor.execute(query)
-            
-            while True:
-                rows = cursor.fetchmany(batch_size)
-                if not rows:
-                    break
-                
-                for row in rows:
-                    yield dict(row)
+            for rows in stream_query(conn, query, fetch_size=batch_size, dictionary=True):
+                # The dictionary cursor already builds a dict per row, no copy needed
+                yield from rows
                     
         except Error as e:
             print(f"Error streaming rows: {e}")
             raise
-        finally:
-            if cursor:
-                cursor.close()
     
     def close_connection(self) -> None:
         """
@@ -196,6 +1416,188 @@ class DatabaseManager:
             print("Database connection closed")
 
 
+class ConnectionPool:
+    """
+    Bounded pool of connections to the ALX_prodev database.
+    Connections are opened lazily, checked for liveness on checkout and
+    handed back to the pool when the `connection()` context exits, so
+    connection setup is paid once instead of on every generator call.
+    """
+
+    def __init__(self, max_size: int = 5, factory: Optional[Callable[[], Any]] = None,
+                 timeout: Optional[float] = 30.0):
+        """
+        Args:
+            max_size: Maximum number of connections open at the same time
+            factory: Callable returning a new connection (defaults to connect_to_prodev)
+            timeout: Seconds to wait for a free connection (None waits forever)
+        """
+        if max_size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.max_size = max_size
+        self.timeout = timeout
+        self._factory = factory or (lambda: DatabaseManager().connect_to_prodev())
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._closed = False
+
+    @staticmethod
+    def _is_alive(connection: Any) -> bool:
+        """
+        Returns True if the connection still answers the server
+        """
+        try:
+            return connection.is_connected()
+        except Error:
+            return False
+
+    @staticmethod
+    def _discard(connection: Any) -> None:
+        """
+        Closes a connection, ignoring errors from already broken sockets
+        """
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def acquire(self) -> Any:
+        """
+        Checks out a live connection, opening a new one if no idle connection is usable
+        """
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        with get_instrumentation().timed('pool_wait'):
+            acquired = self._slots.acquire(timeout=-1 if self.timeout is None else self.timeout)
+        if not acquired:
+            raise TimeoutError(f"No connection available after {self.timeout}s (pool size {self.max_size})")
+
+        try:
+            while True:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._factory()
+                if self._is_alive(connection):
+                    return connection
+                self._discard(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection: Any) -> None:
+        """
+        Returns a connection to the pool after resetting its session state.
+        Any open transaction is rolled back so the next user does not inherit a
+        stale snapshot; connections with unread results are closed instead.
+        """
+        try:
+            if self._closed:
+                self._discard(connection)
+                return
+            if getattr(connection, 'unread_result', False):
+                # An abandoned unbuffered stream: draining millions of rows just to
+                # reuse the socket costs more than opening a new connection
+                self._discard(connection)
+                return
+            try:
+                connection.rollback()
+            except Error:
+                self._discard(connection)
+                return
+            self._idle.put(connection)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Generator[Any, None, None]:
+        """
+        Context manager that checks out a connection and always returns it
+
+        Example:
+            with get_pool().connection() as connection:
+                cursor = connection.cursor()
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close_all(self) -> None:
+        """
+        Closes every idle connection; connections still checked out are closed on release
+        """
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+_backend: Optional[Any] = None
+
+
+def get_backend() -> Any:
+    """
+    Returns the process-wide storage backend, chosen by the DB_BACKEND
+    environment variable ('mysql' or 'sqlite') unless set_backend was called
+    """
+    global _backend
+    if _backend is None:
+        _backend = backend_from_env()
+    return _backend
+
+
+def set_backend(backend: Any) -> None:
+    """
+    Switches every generator module to another backend.
+    The shared pool is closed so new connections use the new backend.
+    """
+    global _backend, _pool
+    _backend = backend
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+
+
+def get_pool(max_size: Optional[int] = None) -> ConnectionPool:
+    """
+    Returns the process-wide connection pool shared by all generator modules,
+    creating it on first use
+
+    Args:
+        max_size: Pool size; only used when the pool is created (default 5).
+                  Asking for a different size once the pool exists raises
+                  ValueError instead of silently returning the existing pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = ConnectionPool(max_size=max_size or 5)
+        elif max_size is not None and max_size != _pool.max_size:
+            raise ValueError(
+                f"The connection pool already exists with max_size={_pool.max_size}, "
+                f"cannot resize it to {max_size}"
+            )
+        return _pool
+
+
+def reset_pool() -> None:
+    """
+    Forgets the pool inherited by a forked worker process. The inherited
+    connections share sockets with the parent, so they are dropped without
+    being closed; the worker opens its own on first use.
+    """
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
 # Example usage and demonstration
 def main():
     # Initialize database manager
@@ -213,6 +1615,8 @@ def main():
         
         # Step 3: Load sample data from CSV (uncomment when you have the CSV file)
         # db_manager.load_data_from_csv(prodev_connection, 'user_data.csv')
+        # For large files, use the bulk mode (multi-row INSERTs, one commit per chunk):
+        # db_manager.load_data_from_csv(prodev_connection, 'user_data.csv', batch_size=5000)
         
         # Step 4: Insert some sample data for demonstration
         sample_data = [
@@ -0,0 +1,196 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional
+
+from aggregation import aggregate_stream
+from seed import QuerySpec
+
+stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+
+# Batches queued per consumer before the scan waits for it
+CONSUMER_BUFFER = 2
+
+Consumer = Callable[[Iterable[Any]], Any]
+
+
+class _Subscriber:
+    """
+    One registered consumer: its thread, bounded queue and outcome
+    """
+
+    def __init__(self, name: str, consumer: Consumer, buffer: int):
+        self.name = name
+        self.consumer = consumer
+        self.buffer: queue.Queue = queue.Queue(maxsize=buffer)
+        # Set when the consumer returned or failed; the scan stops feeding it
+        self.finished = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.batches = 0
+        self.wait_seconds = 0.0
+        self.thread = threading.Thread(target=self._run, name=f"shared-scan-{name}", daemon=True)
+
+    def _batches(self) -> Generator[Any, None, None]:
+        while True:
+            batch = self.buffer.get()
+            if batch is _END:
+                return
+            yield batch
+
+    def _run(self) -> None:
+        try:
+            self.result = self.consumer(self._batches())
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.finished.set()
+
+    def put(self, item: Any) -> None:
+        # Blocks while the buffer is full (backpressure), waking up regularly
+        # so a consumer that stopped early no longer holds the scan back
+        start = time.perf_counter()
+        while not self.finished.is_set():
+            try:
+                self.buffer.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.wait_seconds += time.perf_counter() - start
+
+
+_END = object()
+
+
+class SharedScan:
+    """
+    Reads user_data once and fans every batch out to all registered
+    consumers. Each consumer is a function taking an iterable of batches and
+    returning a result; it runs on its own thread behind a bounded queue of
+    `buffer` batches. When a queue is full the scan waits, so the slowest
+    consumer sets the pace and memory stays at about
+    (consumers * buffer + 1) batches, whatever the table size.
+
+    Batches are shared between consumers and must not be modified.
+
+    Example:
+        scan = SharedScan(batch_size=10000)
+        scan.register('average_age', average_age)
+        scan.register('over_25', count_over_25)
+        scan.register('export', functools.partial(export_batches, 'users.csv', fmt='csv'))
+        results = scan.run()
+    """
+
+    def __init__(self, batch_size: int = 10000, spec: Optional[QuerySpec] = None,
+                 row_format: str = 'dict', buffer: int = CONSUMER_BUFFER):
+        """
+        Args:
+            batch_size: Rows per batch read from the database
+            spec: Optional QuerySpec; it must select every column a consumer needs
+            row_format: Row format of the batches handed to the consumers
+            buffer: Default number of batches queued per consumer
+        """
+        if buffer < 1:
+            raise ValueError("Consumer buffer must be at least 1")
+        self.batch_size = batch_size
+        self.spec = spec
+        self.row_format = row_format
+        self.buffer = buffer
+        self._subscribers: List[_Subscriber] = []
+
+    def register(self, name: str, consumer: Consumer, buffer: Optional[int] = None) -> 'SharedScan':
+        """
+        Adds a consumer under a unique name and returns self
+
+        Args:
+            name: Key of the consumer's result in run()
+            consumer: Function(batches) -> result; it may stop reading early
+            buffer: Batches queued for this consumer (defaults to the scan's buffer)
+        """
+        if any(subscriber.name == name for subscriber in self._subscribers):
+            raise ValueError(f"A consumer named {name!r} is already registered")
+        self._subscribers.append(_Subscriber(name, consumer, buffer or self.buffer))
+        return self
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Performs the single scan and waits for every consumer.
+
+        Returns:
+            {consumer name: result}
+
+        Raises:
+            The first consumer error, once the scan and the other consumers finished
+        """
+        if not self._subscribers:
+            raise ValueError("SharedScan.run() needs at least one registered consumer")
+        subscribers = self._subscribers
+        self._subscribers = []
+        for subscriber in subscribers:
+            subscriber.thread.start()
+
+        batches = stream_users_in_batches(self.batch_size, self.spec, self.row_format)
+        try:
+            for batch in batches:
+                active = [subscriber for subscriber in subscribers if not subscriber.finished.is_set()]
+                if not active:
+                    # Every consumer stopped early; no need to read the rest
+                    break
+                for subscriber in active:
+                    subscriber.put(batch)
+                    subscriber.batches += 1
+        finally:
+            batches.close()
+            for subscriber in subscribers:
+                subscriber.put(_END)
+            for subscriber in subscribers:
+                subscriber.thread.join()
+
+        for subscriber in subscribers:
+            print(
+                f"Consumer {subscriber.name}: {subscriber.batches} batches, "
+                f"scan waited {subscriber.wait_seconds:.2f}s on it"
+            )
+        for subscriber in subscribers:
+            if subscriber.error is not None:
+                print(f"Consumer {subscriber.name} failed: {subscriber.error}")
+                raise subscriber.error
+        return {subscriber.name: subscriber.result for subscriber in subscribers}
+
+
+def scan_once(consumers: Dict[str, Consumer], batch_size: int = 10000,
+              spec: Optional[QuerySpec] = None, row_format: str = 'dict',
+              buffer: int = CONSUMER_BUFFER) -> Dict[str, Any]:
+    """
+    Runs several consumers over one scan of user_data (see SharedScan)
+
+    Args:
+        consumers: {name: function(batches) -> result}
+        batch_size: Rows per batch
+        spec: Optional QuerySpec shared by all consumers
+        row_format: Row format of the batches ('dict' by default)
+        buffer: Batches queued per consumer
+
+    Returns:
+        {name: result}
+    """
+    scan = SharedScan(batch_size, spec, row_format, buffer)
+    for name, consumer in consumers.items():
+        scan.register(name, consumer)
+    return scan.run()
+
+
+def average_age(batches: Iterable[Any]) -> float:
+    """
+    Consumer computing what calculate_average_age(push_down=False) returns,
+    from 'dict' batches
+    """
+    average = aggregate_stream((user['age'] for batch in batches for user in batch), metrics=['avg'])['avg']
+    return 0.0 if average is None else average
+
+
+def count_over_25(batches: Iterable[Any]) -> int:
+    """
+    Consumer counting the users batch_processing yields, from 'dict' batches
+    """
+    return sum(1 for batch in batches for user in batch if user['age'] > 25)
@@ -0,0 +1,312 @@
+import hashlib
+import math
+import random
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from aggregation import Number, _to_number
+from parallel_scan import parallel_scan
+from seed import QuerySpec
+
+stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+
+# Quantiles reported by UserSketches.result() unless others are requested
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty 2016). Keeps a stack of
+    compactors; when the sketch is full, a level is sorted and every other
+    item is promoted to the next level with double weight. Memory is
+    O(k log(n/k)) items and rank error about 1.7/k (1% at k=200) regardless
+    of stream length. Sketches of separate streams merge into one.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = k
+        self.count = 0
+        self.min: Optional[Number] = None
+        self.max: Optional[Number] = None
+        self.compactors: List[List[Number]] = [[]]
+        self._random = random.Random(seed)
+        self._size = 0
+        self._max_size = self._capacity(0)
+
+    def _capacity(self, level: int) -> int:
+        # Lower levels hold fewer items; the top level holds k
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _grow(self) -> None:
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self) -> None:
+        while self._size >= self._max_size:
+            for level, items in enumerate(self.compactors):
+                if len(items) < self._capacity(level):
+                    continue
+                if level + 1 == len(self.compactors):
+                    self._grow()
+                items.sort()
+                # An odd item out stays at this level with its current weight
+                kept = [items.pop()] if len(items) % 2 else []
+                promoted = items[self._random.getrandbits(1)::2]
+                self.compactors[level + 1].extend(promoted)
+                self.compactors[level] = kept
+                self._size = sum(len(compactor) for compactor in self.compactors)
+                break
+
+    def add(self, value: Number) -> None:
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.compactors[0].append(value)
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """
+        Folds another sketch into this one and returns self
+        """
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        self._size = sum(len(compactor) for compactor in self.compactors)
+        self._compress()
+        return self
+
+    def _weighted(self) -> List[Tuple[Number, int]]:
+        return sorted(
+            (value, 1 << level) for level, items in enumerate(self.compactors) for value in items
+        )
+
+    def quantiles(self, fractions: Sequence[float]) -> Dict[float, Optional[Number]]:
+        """
+        Returns the approximate value at each fraction (0.5 for the median).
+        The minimum and maximum are exact.
+        """
+        if not self.count:
+            return {fraction: None for fraction in fractions}
+        weighted = self._weighted()
+        total = sum(weight for _, weight in weighted)
+        results = {}
+        for fraction in fractions:
+            if not 0 <= fraction <= 1:
+                raise ValueError("Quantile fractions must be between 0 and 1")
+            if fraction == 0:
+                results[fraction] = self.min
+                continue
+            if fraction == 1:
+                results[fraction] = self.max
+                continue
+            target = fraction * total
+            seen = 0
+            for value, weight in weighted:
+                seen += weight
+                if seen >= target:
+                    results[fraction] = value
+                    break
+        return results
+
+    def quantile(self, fraction: float) -> Optional[Number]:
+        return self.quantiles([fraction])[fraction]
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter (Flajolet et al. 2007) over 64-bit hashes.
+    Uses 2**precision one-byte registers (4 KiB at the default 12) for a
+    standard error of 1.04 / sqrt(2**precision), about 1.6%. Merging takes
+    the register-wise maximum, so partial counts combine exactly.
+    """
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: str) -> None:
+        hashed = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = hashed >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        rest = hashed & ((1 << remaining_bits) - 1)
+        # Position of the leftmost 1-bit in the remaining bits
+        rank = remaining_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """
+        Folds another counter of the same precision into this one and returns self
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog counters of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        registers = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / registers)
+        estimate = alpha * registers * registers / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * registers and zeros:
+            # Small-range correction: linear counting is more accurate here
+            estimate = registers * math.log(registers / zeros)
+        return int(round(estimate))
+
+
+class FixedHistogram:
+    """
+    Counts values in fixed-width buckets over [low, high), plus underflow and
+    overflow counters, so memory is fixed by the bucket layout
+    """
+
+    def __init__(self, low: Number = 0, high: Number = 120, width: Number = 10):
+        if width <= 0 or high <= low:
+            raise ValueError("Histogram needs width > 0 and high > low")
+        self.low = low
+        self.high = high
+        self.width = width
+        self.counts = [0] * int(math.ceil((high - low) / width))
+        self.underflow = 0
+        self.overflow = 0
+
+    def add(self, value: Number) -> None:
+        if value < self.low:
+            self.underflow += 1
+        elif value >= self.high:
+            self.overflow += 1
+        else:
+            self.counts[int((value - self.low) // self.width)] += 1
+
+    def merge(self, other: 'FixedHistogram') -> 'FixedHistogram':
+        """
+        Folds another histogram with the same bucket layout into this one and returns self
+        """
+        if (other.low, other.high, other.width) != (self.low, self.high, self.width):
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Returns {'buckets': {bucket_start: count}, 'underflow': n, 'overflow': n}
+        """
+        return {
+            'buckets': {_to_number(self.low + index * self.width): count for index, count in enumerate(self.counts)},
+            'underflow': self.underflow,
+            'overflow': self.overflow,
+        }
+
+
+class UserSketches:
+    """
+    The sketches computed over user_data in one pass: age quantiles (KLL),
+    an age histogram and the number of distinct email domains (HyperLogLog)
+    """
+
+    def __init__(self, k: int = 200, precision: int = 12,
+                 low: Number = 0, high: Number = 120, width: Number = 10):
+        self.ages = KLLSketch(k)
+        self.histogram = FixedHistogram(low, high, width)
+        self.domains = HyperLogLog(precision)
+
+    def add_age(self, age: Any) -> None:
+        age = _to_number(age)
+        self.ages.add(age)
+        self.histogram.add(age)
+
+    def add_email(self, email: str) -> None:
+        self.domains.add(email.rpartition('@')[2].lower())
+
+    def add_batch(self, batch: Dict[str, Any]) -> 'UserSketches':
+        """
+        Adds a 'columns' format batch (see seed.ROW_FORMATS) and returns self
+        """
+        for age in batch.get('age', ()):
+            self.add_age(age)
+        for email in batch.get('email', ()):
+            self.add_email(email)
+        return self
+
+    def merge(self, other: 'UserSketches') -> 'UserSketches':
+        """
+        Folds sketches of another partition into these and returns self
+        """
+        self.ages.merge(other.ages)
+        self.histogram.merge(other.histogram)
+        self.domains.merge(other.domains)
+        return self
+
+    def result(self, fractions: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, Any]:
+        return {
+            'count': self.ages.count,
+            'age_min': _to_number(self.ages.min),
+            'age_max': _to_number(self.ages.max),
+            'age_quantiles': self.ages.quantiles(fractions),
+            'age_histogram': self.histogram.result(),
+            'distinct_email_domains': self.domains.count(),
+        }
+
+
+def sketch_ages(ages: Iterable[Any], k: int = 200) -> KLLSketch:
+    """
+    Builds a quantile sketch from any age generator, e.g. stream_user_ages()
+    """
+    sketch = KLLSketch(k)
+    for age in ages:
+        sketch.add(_to_number(age))
+    return sketch
+
+
+def _sketch_batch(batch: Dict[str, Any]) -> UserSketches:
+    """
+    parallel_scan worker hook: turns one batch into sketches on the worker
+    """
+    return UserSketches().add_batch(batch)
+
+
+def sketch_users(batch_size: int = 10000, spec: Optional[QuerySpec] = None,
+                 partitions: Optional[int] = None,
+                 fractions: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, Any]:
+    """
+    Computes age quantiles, an age histogram and the distinct email domain
+    count in a single pass over user_data, with memory bounded by the
+    sketches and one batch.
+
+    Args:
+        batch_size: Rows per streamed batch
+        spec: Optional QuerySpec filtering the rows (age and email are always selected)
+        partitions: When set, scan with parallel_scan; each worker sketches its
+                    batches and the parent merges the partial sketches
+        fractions: Quantiles to report
+
+    Returns:
+        Dictionary with count, age_min, age_max, age_quantiles, age_histogram
+        and distinct_email_domains
+    """
+    spec = (spec or QuerySpec()).select('age', 'email')
+    sketches = UserSketches()
+    if partitions:
+        for partial in parallel_scan(partitions, spec=spec, batch_size=batch_size,
+                                     row_format='columns', process_batch=_sketch_batch):
+            sketches.merge(partial)
+    else:
+        for batch in stream_users_in_batches(batch_size, spec, row_format='columns'):
+            sketches.add_batch(batch)
+    return sketches.result(fractions)
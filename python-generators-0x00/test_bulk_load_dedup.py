@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Unit tests for duplicate handling in bulk_load_csv(dedup=True).
+"""
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+from unittest.mock import patch
+
+import seed
+from backends import SQLiteBackend
+from seed import BloomFilter, DatabaseManager, KeySet, get_pool
+
+
+def make_key(index):
+    """Deterministic UUID string for row `index`."""
+    return str(uuid.UUID(int=index + 1))
+
+
+class TestBulkLoadDedup(unittest.TestCase):
+    """Loads CSV files with repeated and pre-existing keys into SQLite."""
+
+    def setUp(self):
+        """Creates an empty user_data table holding keys 0-9."""
+        self.directory = tempfile.mkdtemp()
+        self.previous_backend = seed.get_backend()
+        seed.set_backend(SQLiteBackend(os.path.join(self.directory, 'dedup.sqlite3'), key_format='uuid'))
+        self.db_manager = DatabaseManager()
+        with get_pool().connection() as connection:
+            self.db_manager.create_table(connection)
+            self.db_manager.insert_batch(
+                connection, [(make_key(index), 'Old', 'old@example.com', 30) for index in range(10)]
+            )
+            connection.commit()
+
+    def tearDown(self):
+        """Restores the previous backend and removes the database."""
+        seed.set_backend(self.previous_backend)
+        shutil.rmtree(self.directory)
+
+    def write_csv(self, keys):
+        """Writes one row per key, named after its position in the file."""
+        path = os.path.join(self.directory, 'users.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['user_id', 'name', 'email', 'age'])
+            for position, key in enumerate(keys):
+                writer.writerow([key, f"Row {position}", f"row{position}@example.com", 40])
+        return path
+
+    def table_names(self):
+        """Returns {user_id: name} for the whole table."""
+        with get_pool().connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT user_id, name FROM user_data")
+            names = dict(cursor.fetchall())
+            cursor.close()
+        return names
+
+    def test_ignore_drops_file_and_table_duplicates(self):
+        """
+        Test that 'ignore' keeps the first row of a key repeated across
+        chunks and skips keys already in the table, with exact counters.
+        """
+        # Keys 5 and 6 are in the table; 20 repeats in a later chunk, 21 in the same one
+        keys = [make_key(index) for index in (20, 5, 21, 21, 22, 6, 20, 23)]
+        path = self.write_csv(keys)
+        with get_pool().connection() as connection:
+            stats = self.db_manager.bulk_load_csv(connection, path, batch_size=3, dedup=True)
+
+        self.assertEqual(stats['rows_read'], 8)
+        self.assertEqual(stats['rows_inserted'], 4)
+        self.assertEqual(stats['duplicates'], 4)
+        self.assertEqual(stats['duplicates_in_file'], 2)
+        self.assertGreaterEqual(stats['exact_checks'], 2)
+        names = self.table_names()
+        self.assertEqual(len(names), 14)
+        self.assertEqual(names[make_key(20)], 'Row 0')
+        self.assertEqual(names[make_key(21)], 'Row 2')
+        self.assertEqual(names[make_key(5)], 'Old')
+
+    def test_update_keeps_last_row_without_scanning_the_table(self):
+        """
+        Test that 'update' writes the last row of a repeated key, overwrites
+        table rows and never builds the table's BloomFilter.
+        """
+        keys = [make_key(index) for index in (20, 5, 20, 21)]
+        path = self.write_csv(keys)
+        with get_pool().connection() as connection, \
+                patch.object(DatabaseManager, 'load_existing_keys') as load_existing_keys:
+            stats = self.db_manager.bulk_load_csv(connection, path, batch_size=3,
+                                                  on_duplicate='update', dedup=True)
+
+        load_existing_keys.assert_not_called()
+        self.assertEqual(stats['duplicates_in_file'], 1)
+        self.assertEqual(stats['exact_checks'], 0)
+        names = self.table_names()
+        self.assertEqual(names[make_key(20)], 'Row 2')
+        self.assertEqual(names[make_key(5)], 'Row 1')
+
+    def test_false_positives_are_confirmed_by_one_query(self):
+        """
+        Test that keys a saturated BloomFilter reports as present are checked
+        exactly and still written when they are new.
+        """
+        saturated = BloomFilter(1)
+        saturated.bits = bytearray(b'\xff' * len(saturated.bits))
+        chunk = [(make_key(index), 'New', 'new@example.com', 40) for index in (3, 30, 31)]
+        stats = {'duplicates': 0, 'duplicates_in_file': 0, 'exact_checks': 0}
+        with get_pool().connection() as connection, \
+                patch.object(DatabaseManager, 'existing_keys', autospec=True,
+                             side_effect=DatabaseManager.existing_keys) as existing_keys:
+            kept = self.db_manager.dedup_chunk(connection, chunk, saturated, KeySet(), 'ignore', stats)
+
+        existing_keys.assert_called_once()
+        self.assertEqual([row[0] for row in kept], [make_key(30), make_key(31)])
+        self.assertEqual(stats['exact_checks'], 3)
+        self.assertEqual(stats['duplicates'], 1)
+
+
+class TestKeySet(unittest.TestCase):
+    """Exactness of the compact key set used for in-file duplicates."""
+
+    def test_membership_across_growth(self):
+        """Test that every added key is found after the table grows."""
+        keys = [str(uuid.uuid4()) for _ in range(5000)]
+        key_set = KeySet(capacity=16)
+        self.assertTrue(all(key_set.add(key) for key in keys))
+        self.assertFalse(any(key_set.add(key) for key in keys))
+        self.assertEqual(len(key_set), len(keys))
+        self.assertTrue(all(key in key_set for key in keys))
+        self.assertNotIn(str(uuid.uuid4()), key_set)
+
+    def test_nil_uuid_and_other_keys(self):
+        """Test the all-zero UUID and non-UUID keys."""
+        key_set = KeySet()
+        nil = str(uuid.UUID(int=0))
+        self.assertNotIn(nil, key_set)
+        self.assertTrue(key_set.add(nil))
+        self.assertFalse(key_set.add(nil))
+        self.assertTrue(key_set.add('legacy-42'))
+        self.assertIn('legacy-42', key_set)
+        self.assertEqual(len(key_set), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
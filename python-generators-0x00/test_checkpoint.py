@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Unit tests for resuming stream_users_in_batches from a checkpoint.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+
+import seed
+from backends import SQLiteBackend
+from checkpoint import FileCheckpoint, SQLiteCheckpoint
+from seed import DatabaseManager, QuerySpec, get_pool
+
+stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+
+TOTAL_ROWS = 1000
+BATCH_SIZE = 64
+
+
+class Crash(Exception):
+    """Raised by a consumer to simulate a job dying mid-stream."""
+
+
+class TestCheckpointedBatches(unittest.TestCase):
+    """Stops checkpointed scans mid-stream and resumes them."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Builds a throwaway SQLite user_data table of TOTAL_ROWS rows."""
+        cls.directory = tempfile.mkdtemp()
+        cls.previous_backend = seed.get_backend()
+        seed.set_backend(SQLiteBackend(os.path.join(cls.directory, 'checkpoint.sqlite3'), key_format='uuid'))
+        rows = [
+            (str(uuid.uuid4()), f"User {index}", f"user{index}@example.com", 18 + index % 80)
+            for index in range(TOTAL_ROWS)
+        ]
+        db_manager = DatabaseManager()
+        with get_pool().connection() as connection:
+            db_manager.create_table(connection)
+            db_manager.insert_batch(connection, rows)
+            connection.commit()
+        cls.all_ids = sorted(row[0] for row in rows)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Restores the previous backend and removes the table."""
+        seed.set_backend(cls.previous_backend)
+        shutil.rmtree(cls.directory)
+
+    def run_until_crash(self, checkpoint, crash_in_batch, spec=None):
+        """
+        Processes batches until `crash_in_batch` (1-based) raises half way
+        through, and returns the user_ids of the batches fully processed.
+        """
+        processed = []
+        with self.assertRaises(Crash):
+            for number, batch in enumerate(stream_users_in_batches(BATCH_SIZE, spec, checkpoint=checkpoint),
+                                           start=1):
+                if number == crash_in_batch:
+                    raise Crash()
+                processed.extend(user['user_id'] for user in batch)
+        return processed
+
+    def resume(self, checkpoint, spec=None):
+        """Runs the same job to the end and returns the user_ids it processed."""
+        return [user['user_id'] for batch in stream_users_in_batches(BATCH_SIZE, spec, checkpoint=checkpoint)
+                for user in batch]
+
+    def test_resume_loses_and_repeats_no_rows(self):
+        """
+        Test that a restart with the same FileCheckpoint processes exactly the
+        rows the crashed run did not finish, in user_id order.
+        """
+        checkpoint = FileCheckpoint(os.path.join(self.directory, 'job.ckpt'))
+        before = self.run_until_crash(checkpoint, crash_in_batch=4)
+        self.assertEqual(len(before), 3 * BATCH_SIZE)
+        self.assertEqual(checkpoint.load(), before[-1])
+
+        after = self.resume(checkpoint)
+        self.assertEqual(before + after, self.all_ids)
+        self.assertEqual(checkpoint.load(), self.all_ids[-1])
+        checkpoint.clear()
+        self.assertIsNone(checkpoint.load())
+
+    def test_resume_with_filter_and_sqlite_checkpoint(self):
+        """
+        Test resuming a filtered, projected scan with SQLiteCheckpoint, and
+        that user_id is added to the projection.
+        """
+        spec = QuerySpec().where('age', '>', 50).select('age')
+        checkpoint = SQLiteCheckpoint(os.path.join(self.directory, 'jobs.sqlite3'), 'over_50')
+        before = self.run_until_crash(checkpoint, crash_in_batch=2, spec=spec)
+        after = self.resume(checkpoint, spec)
+
+        with get_pool().connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT user_id FROM user_data WHERE age > 50 ORDER BY user_id")
+            expected = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        self.assertEqual(before + after, expected)
+
+    def test_spec_with_its_own_ordering_is_rejected(self):
+        """
+        Test that a spec ordered by another column raises ValueError, while
+        one already ordered by user_id is accepted.
+        """
+        checkpoint = FileCheckpoint(os.path.join(self.directory, 'ordered.ckpt'))
+        with self.assertRaises(ValueError):
+            next(stream_users_in_batches(BATCH_SIZE, QuerySpec().order_by('age'), checkpoint=checkpoint))
+        batches = stream_users_in_batches(BATCH_SIZE, QuerySpec().order_by('user_id'), checkpoint=checkpoint)
+        self.assertEqual(len(next(batches)), BATCH_SIZE)
+        batches.close()
+        checkpoint.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Unit tests for keyset pagination and its continuation tokens.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+
+import seed
+from backends import SQLiteBackend
+from seed import DatabaseManager, get_pool
+
+lazy_paginate_module = __import__('2-lazy_paginate')
+lazy_paginate = lazy_paginate_module.lazy_paginate
+lazy_paginate_keyset = lazy_paginate_module.lazy_paginate_keyset
+decode_page_token = lazy_paginate_module.decode_page_token
+
+TOTAL_ROWS = 250
+PAGE_SIZE = 40
+
+
+class TestKeysetTokens(unittest.TestCase):
+    """Resumes keyset pagination from its tokens on a throwaway table."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Builds a SQLite user_data table of TOTAL_ROWS rows."""
+        cls.directory = tempfile.mkdtemp()
+        cls.previous_backend = seed.get_backend()
+        seed.set_backend(SQLiteBackend(os.path.join(cls.directory, 'paginate.sqlite3'), key_format='uuid'))
+        rows = [
+            (str(uuid.uuid4()), f"User {index}", f"user{index}@example.com", 18 + index % 80)
+            for index in range(TOTAL_ROWS)
+        ]
+        db_manager = DatabaseManager()
+        with get_pool().connection() as connection:
+            db_manager.create_table(connection)
+            db_manager.insert_batch(connection, rows)
+            connection.commit()
+        cls.all_ids = sorted(row[0] for row in rows)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Restores the previous backend and removes the table."""
+        seed.set_backend(cls.previous_backend)
+        shutil.rmtree(cls.directory)
+
+    @staticmethod
+    def page_ids(pages):
+        """Returns the user_ids of every (page, token) pair, page by page."""
+        return [[user['user_id'] for user in page] for page, _ in pages]
+
+    def test_full_walk_matches_offset_mode(self):
+        """Test that keyset pages cover the table once, like offset pages."""
+        pages = list(lazy_paginate_keyset(PAGE_SIZE))
+        self.assertEqual(sum(self.page_ids(pages), []), self.all_ids)
+        self.assertIsNone(pages[-1][1])
+        self.assertTrue(all(token for _, token in pages[:-1]))
+        offset_ids = [user['user_id'] for page in lazy_paginate(PAGE_SIZE) for user in page]
+        self.assertEqual(sorted(offset_ids), self.all_ids)
+
+    def test_resuming_from_every_token_yields_the_remaining_pages(self):
+        """
+        Test that restarting from the token of page N yields exactly pages
+        N+1 onwards.
+        """
+        pages = list(lazy_paginate_keyset(PAGE_SIZE))
+        expected = self.page_ids(pages)
+        for number, (_, token) in enumerate(pages[:-1], start=1):
+            with self.subTest(page=number):
+                resumed = list(lazy_paginate_keyset(PAGE_SIZE, token))
+                self.assertEqual(self.page_ids(resumed), expected[number:])
+
+    def test_exact_multiple_ends_with_an_empty_walk(self):
+        """Test that the token of a full last page resumes to nothing."""
+        pages = list(lazy_paginate_keyset(TOTAL_ROWS // 5))
+        self.assertEqual(len(pages), 5)
+        self.assertIsNotNone(pages[-1][1])
+        self.assertEqual(list(lazy_paginate_keyset(TOTAL_ROWS // 5, pages[-1][1])), [])
+
+    def test_malformed_tokens_raise_value_error(self):
+        """Test that garbage, truncated and keyless tokens are rejected."""
+        _, token = next(lazy_paginate_keyset(PAGE_SIZE))
+        for bad in ('not a token!', token[:-4], 'e30=', 'W10='):
+            with self.subTest(token=bad):
+                with self.assertRaisesRegex(ValueError, "Invalid page token"):
+                    next(lazy_paginate_keyset(PAGE_SIZE, bad))
+                with self.assertRaisesRegex(ValueError, "Invalid page token"):
+                    decode_page_token(bad)
+
+
+if __name__ == '__main__':
+    unittest.main()
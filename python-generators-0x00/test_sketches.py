@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the accuracy and mergeability of the sketches.
+"""
+
+import bisect
+import random
+import unittest
+
+from sketches import HyperLogLog, KLLSketch
+
+FRACTIONS = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+# Allowed rank error of KLLSketch(k=200): about three times the expected 1%
+RANK_TOLERANCE = 0.03
+
+# Allowed relative error of HyperLogLog(12): about three standard errors
+COUNT_TOLERANCE = 0.05
+
+
+class TestKLLSketch(unittest.TestCase):
+    """Rank error of KLLSketch against the exact ranks."""
+
+    def setUp(self):
+        """Builds a shuffled stream of distinct values."""
+        rng = random.Random(7)
+        self.values = [rng.random() * 1000 for _ in range(50000)]
+        self.ordered = sorted(self.values)
+
+    def assert_rank_error(self, sketch):
+        """Checks every FRACTIONS quantile against its exact rank."""
+        for fraction, value in sketch.quantiles(FRACTIONS).items():
+            rank = bisect.bisect_right(self.ordered, value) / len(self.ordered)
+            with self.subTest(fraction=fraction):
+                self.assertLessEqual(abs(rank - fraction), RANK_TOLERANCE)
+
+    def test_rank_error_of_one_stream(self):
+        """Test the quantiles, count and exact extremes of one sketch."""
+        sketch = KLLSketch(k=200, seed=1)
+        for value in self.values:
+            sketch.add(value)
+        self.assert_rank_error(sketch)
+        self.assertEqual(sketch.count, len(self.values))
+        self.assertEqual(sketch.quantile(0), self.ordered[0])
+        self.assertEqual(sketch.quantile(1), self.ordered[-1])
+
+    def test_rank_error_after_merging_partial_sketches(self):
+        """Test that merged partial sketches keep the rank error bound."""
+        parts = [KLLSketch(k=200, seed=index) for index in range(4)]
+        for position, value in enumerate(self.values):
+            parts[position % 4].add(value)
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+        self.assert_rank_error(merged)
+        self.assertEqual(merged.count, len(self.values))
+        self.assertEqual((merged.min, merged.max), (self.ordered[0], self.ordered[-1]))
+
+    def test_empty_sketch(self):
+        """Test that an empty sketch has no quantiles."""
+        self.assertIsNone(KLLSketch().quantile(0.5))
+
+
+class TestHyperLogLog(unittest.TestCase):
+    """Relative error of HyperLogLog against exact distinct counts."""
+
+    def test_relative_error(self):
+        """Test small and large cardinalities, with repeated values."""
+        for distinct in (100, 5000, 100000):
+            with self.subTest(distinct=distinct):
+                counter = HyperLogLog()
+                for index in range(distinct * 2):
+                    counter.add(f"user{index % distinct}@example.com")
+                self.assertLessEqual(abs(counter.count() - distinct) / distinct, COUNT_TOLERANCE)
+
+    def test_merge_equals_one_counter_over_the_union(self):
+        """Test that merging overlapping partial counters counts the union."""
+        keys = [f"domain{index}.example" for index in range(60000)]
+        whole = HyperLogLog()
+        parts = [HyperLogLog() for _ in range(3)]
+        for index, key in enumerate(keys):
+            whole.add(key)
+            # Every key goes to one part, every fifth one also to the next part
+            parts[index % 3].add(key)
+            if index % 5 == 0:
+                parts[(index + 1) % 3].add(key)
+        merged = parts[0].merge(parts[1]).merge(parts[2])
+        self.assertEqual(merged.registers, whole.registers)
+        self.assertLessEqual(abs(merged.count() - len(keys)) / len(keys), COUNT_TOLERANCE)
+
+    def test_merge_rejects_other_precision(self):
+        """Test that counters of different precision do not merge."""
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the bounded-memory guarantee of stream_users.
+"""
+
+import os
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+import uuid
+
+import seed
+from backends import SQLiteBackend
+from seed import STREAM_BASELINE_BYTES, STREAM_ROW_BYTES, DatabaseManager, chunked, get_pool
+
+stream_users = __import__('0-stream_users').stream_users
+
+TOTAL_ROWS = 20000
+
+
+class TestStreamUsersMemory(unittest.TestCase):
+    """Checks stream_users against the documented per-row memory ceiling."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Builds a throwaway SQLite user_data table of TOTAL_ROWS rows."""
+        cls.directory = tempfile.mkdtemp()
+        cls.previous_backend = seed.get_backend()
+        seed.set_backend(SQLiteBackend(os.path.join(cls.directory, 'stream_memory.sqlite3'), key_format='uuid'))
+        db_manager = DatabaseManager()
+        rows = (
+            (str(uuid.uuid4()), f"User {index}", f"user{index}@example.com", 18 + index % 80)
+            for index in range(TOTAL_ROWS)
+        )
+        with get_pool().connection() as connection:
+            db_manager.create_table(connection)
+            for chunk in chunked(rows, 5000):
+                db_manager.insert_batch(connection, chunk)
+            connection.commit()
+        # Warm the pool so the connection is not charged to the stream
+        with get_pool().connection():
+            pass
+
+    @classmethod
+    def tearDownClass(cls):
+        """Restores the previous backend and removes the table."""
+        seed.set_backend(cls.previous_backend)
+        shutil.rmtree(cls.directory)
+
+    def traced_peaks(self, fetch_size):
+        """
+        Streams every row and returns the traced peak after the first tenth
+        of the table and at the end.
+        """
+        first_peak = None
+        tracemalloc.start()
+        try:
+            for count, _ in enumerate(stream_users(fetch_size), start=1):
+                if count == TOTAL_ROWS // 10:
+                    first_peak = tracemalloc.get_traced_memory()[1]
+            final_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(count, TOTAL_ROWS)
+        return first_peak, final_peak
+
+    def test_peak_within_documented_ceiling(self):
+        """
+        Test that the peak stays under fetch_size * STREAM_ROW_BYTES +
+        STREAM_BASELINE_BYTES for small and large fetch sizes.
+        """
+        for fetch_size in (100, 1000):
+            with self.subTest(fetch_size=fetch_size):
+                _, final_peak = self.traced_peaks(fetch_size)
+                self.assertLessEqual(final_peak, fetch_size * STREAM_ROW_BYTES + STREAM_BASELINE_BYTES)
+
+    def test_peak_does_not_grow_with_rows_streamed(self):
+        """
+        Test that streaming the rest of the table does not raise the peak
+        by more than one fetch block.
+        """
+        fetch_size = 500
+        first_peak, final_peak = self.traced_peaks(fetch_size)
+        self.assertLessEqual(final_peak, first_peak + fetch_size * STREAM_ROW_BYTES)
+
+
+if __name__ == '__main__':
+    unittest.main()
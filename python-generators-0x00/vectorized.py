@@ -0,0 +1,127 @@
+import itertools
+import operator
+from array import array
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Sequence, Tuple
+
+from seed import QuerySpec
+
+try:
+    import numpy
+except ImportError:  # the array module path needs no extra package
+    numpy = None
+
+stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+
+# Comparison operators usable in vectorized filters
+OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+Filter = Tuple[str, str, Any]
+ColumnBatch = Dict[str, Any]
+
+
+def to_arrays(batch: ColumnBatch) -> ColumnBatch:
+    """
+    Converts a 'columns' batch (see seed.ROW_FORMATS) into column arrays.
+    With NumPy, ages become an int64 ndarray built straight from the batch's
+    array('h') buffer and other columns object ndarrays; without it the
+    batch is returned as is (ages already in an array, strings in lists).
+    """
+    if numpy is None:
+        return batch
+    arrays = {}
+    for column, values in batch.items():
+        if isinstance(values, array):
+            arrays[column] = numpy.frombuffer(values, dtype=numpy.int16).astype(numpy.int64)
+        else:
+            arrays[column] = numpy.array(values, dtype=object)
+    return arrays
+
+
+def batch_length(batch: ColumnBatch) -> int:
+    return len(next(iter(batch.values()))) if batch else 0
+
+
+def mask_for(batch: ColumnBatch, filters: Sequence[Filter]) -> Any:
+    """
+    Evaluates every (column, op, value) filter over whole columns and
+    returns the combined row mask (a bool ndarray, or a list of bools)
+    """
+    mask = None
+    for column, op, value in filters:
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported operator {op!r}, expected one of {tuple(OPERATORS)}")
+        compare = OPERATORS[op]
+        values = batch[column]
+        if numpy is not None:
+            column_mask = compare(values, value)
+            mask = column_mask if mask is None else mask & column_mask
+        else:
+            column_mask = [compare(item, value) for item in values]
+            mask = column_mask if mask is None else [a and b for a, b in zip(mask, column_mask)]
+    return mask
+
+
+def select_rows(batch: ColumnBatch, mask: Any) -> ColumnBatch:
+    """
+    Keeps the rows where mask is true, column by column
+    """
+    if numpy is not None:
+        return {column: values[mask] for column, values in batch.items()}
+    selected = {}
+    for column, values in batch.items():
+        kept = itertools.compress(values, mask)
+        selected[column] = array(values.typecode, kept) if isinstance(values, array) else list(kept)
+    return selected
+
+
+def materialize(batch: ColumnBatch) -> List[Dict[str, Any]]:
+    """
+    Turns a column batch back into one dict per row with plain Python values
+    """
+    columns = list(batch)
+    values = [batch[column] if isinstance(batch[column], list) else batch[column].tolist() for column in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def vectorized_batches(batch_size: int, spec: Optional[QuerySpec] = None,
+                       filters: Sequence[Filter] = (),
+                       derive: Optional[Dict[str, Callable[[ColumnBatch], Iterable[Any]]]] = None,
+                       materialize_rows: bool = False,
+                       prefetch: int = 0) -> Generator[Any, None, None]:
+    """
+    Streams user_data as column arrays and applies filters and derived
+    columns to whole batches at once, instead of looping over one dict per row.
+
+    Args:
+        batch_size: Rows fetched per batch
+        spec: Optional QuerySpec pushed down to SQL (columns, filters, ordering)
+        filters: (column, op, value) conditions evaluated as array comparisons
+        derive: {new_column: function(batch) -> column} computed after filtering,
+                e.g. {'decade': lambda batch: batch['age'] // 10 * 10} with NumPy
+                (without NumPy the function receives arrays/lists and must
+                build the column itself)
+        materialize_rows: Yield lists of row dicts instead of column batches
+        prefetch: Batches fetched ahead on a background thread
+
+    Yields:
+        Column batches ({column: ndarray / array / list}) or lists of row
+        dicts; batches left empty by the filters are skipped
+    """
+    for batch in stream_users_in_batches(batch_size, spec, row_format='columns', prefetch=prefetch):
+        columns = to_arrays(batch)
+        if filters:
+            columns = select_rows(columns, mask_for(columns, filters))
+        if not batch_length(columns):
+            continue
+        for name, function in (derive or {}).items():
+            derived = function(columns)
+            # Generators from the array-module path are materialized into lists
+            columns[name] = derived if hasattr(derived, '__len__') else list(derived)
+        yield materialize(columns) if materialize_rows else columns